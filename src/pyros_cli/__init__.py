@@ -1,17 +1,25 @@
 import asyncio
 
 from loguru import logger
-from rich.console import Console
 
-from pyros_cli.main import start_cli
+from pyros_cli.utils.cli_helper import get_console
 
-console = Console()
+# uvloop gives a faster event loop for the WebSocket and HTTP traffic with
+# ComfyUI. It comes with uvicorn[standard] on Linux/macOS; not on Windows.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 def main() -> None:
+    # Imported here so importing a pyros_cli submodule doesn't load the whole CLI
+    from pyros_cli.main import start_cli
+
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
     try:
-        asyncio.run(start_cli())
+        asyncio.run(start_cli(), loop_factory=loop_factory)
     except KeyboardInterrupt:
-        console.print("\nExiting due to user interrupt.", style="bold red")
+        get_console().print("\nExiting due to user interrupt.", style="bold red")
     except Exception as e:
          # Catch unexpected errors during shutdown or setup
         logger.critical(f"Unhandled exception in main execution: {e}", exc_info=True)
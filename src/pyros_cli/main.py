@@ -5,7 +5,6 @@ import os
 import sys
 import aiohttp
 import questionary
-from rich.console import Console
 from rich.progress import Progress, TextColumn, BarColumn, SpinnerColumn, TimeElapsedColumn
 from loguru import logger
 import websockets
@@ -17,23 +16,19 @@ from pyros_cli.services.config import (
     load_config, save_config,
     check_connection, prompt_for_config
 )
-from pyros_cli.services.gallery import show_gallery
 from pyros_cli.utils.comfy_utils import (
-    load_workflow, update_workflow, send_prompt,
-    listen_for_results, fetch_and_save_final_images
+    load_workflow, make_updater, prepare_websocket, send_prompt,
+    listen_for_results, fetch_and_save_final_images, close_session, close_websocket
 )
 from pyros_cli.services.preview import display_final_image_os
 from pyros_cli.utils.cli_helper import banner_text # Your banner function
-from pyros_cli.utils.cli_helper import print_header, print_error, print_success
+from pyros_cli.utils.cli_helper import print_header, print_error, print_success, console
 from pyros_cli.services.prompt_evaluate import evaluate_prompt, CommandRegistry
 from pyros_cli.models.prompt_vars import load_prompt_vars
 
 
 file_path = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 
-console = Console()
-
-
 
 # Configure Loguru
 def setup_logging():
@@ -130,6 +125,15 @@ def get_autocomplete_suggestions():
     return all_suggestions
 
 async def start_cli():
+    """Run the interactive CLI, closing the shared HTTP session on exit."""
+    try:
+        await _run_cli()
+    finally:
+        await close_websocket()
+        await close_session()
+
+
+async def _run_cli():
     banner_text()
     setup_logging()
     print_header("ComfyUI Settings")
@@ -174,7 +178,7 @@ async def start_cli():
 
     # --- Load Workflow ---
     try:
-        base_workflow = load_workflow(settings.file_path)
+        base_workflow = load_workflow(settings.file_path, trusted=settings.trust_workflow)
     except Exception:
         print_error(f"Failed to load workflow file: {settings.file_path}. Please check the file and configuration.")
         return # Exit if workflow cannot be loaded
@@ -220,6 +224,8 @@ async def start_cli():
             console=console
         ) as progress:
             task = progress.add_task(f"[cyan]Generating {number_of_images} image(s)...", total=number_of_images)
+            # Bound once per batch; rebuilt when a workflow property is added
+            updater = None
             # Either ask for new prompt or use last prompt
             for i in range(number_of_images):
                 
@@ -241,6 +247,7 @@ async def start_cli():
                     if isinstance(command_result.data, WorkflowProperty):
                         # Add the workflow property to the user messages
                         user_messages.add_workflow_property(command_result.data)
+                        updater = None
                         console.print(f"[bold green]Workflow property added:[/] Node: {command_result.data.node_id}, Property: {command_result.data.node_property}, Value: {command_result.data.value}")
                         
                     # If we get here, the command was processed but we should still generate
@@ -266,9 +273,13 @@ async def start_cli():
                 try:
                     progress.update(task, description=f"[cyan]Generating image {i+1}/{number_of_images}: Processing...")
                     # Update workflow dict for this run
-                    updated_workflow_dict = update_workflow(base_workflow, current_prompt, seed, settings, user_messages)
+                    if updater is None:
+                        updater = make_updater(base_workflow, settings, user_messages)
+                    updated_workflow_dict = updater(current_prompt, seed)
 
-                    # Send prompt to ComfyUI
+                    # Send prompt to ComfyUI, dropping WebSocket messages
+                    # queued while idle so only this prompt's are read
+                    await prepare_websocket(settings)
                     prompt_id, client_id = await send_prompt(settings, updated_workflow_dict)
 
                     # Listen for results (includes previews)
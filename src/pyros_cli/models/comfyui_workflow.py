@@ -1,5 +1,6 @@
 from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel
+from pydantic import PrivateAttr
 from pydantic import RootModel
 
 
@@ -19,4 +20,6 @@ class Node(BaseModel):
 
 
 class ComfyUIWorkflow(RootModel[Dict[str, Node]]):
-    pass
\ No newline at end of file
+    # The JSON dict the workflow was validated from, kept so updates can
+    # copy just the nodes they change instead of dumping the whole model
+    _raw: Optional[Dict[str, Any]] = PrivateAttr(default=None)
\ No newline at end of file
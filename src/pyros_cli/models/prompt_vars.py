@@ -1,4 +1,7 @@
+import functools
 import os
+import sys
+from random import Random
 from typing import Optional
 from pydantic import BaseModel
 
@@ -9,7 +12,17 @@ class PromptVars(BaseModel):
     file_path: Optional[str] = None
     prompt_id: Optional[str] = None
     description: Optional[str] = None
-    values: list[str] = []
+    # A tuple: the parsed variables are cached and shared, and tuples index
+    # faster than lists
+    values: tuple[str, ...] = ()
+
+    def random(self, rng: Random) -> str:
+        """Pick one value uniformly at random using rng."""
+        return self.values[rng.randrange(len(self.values))]
+
+    def sample(self, rng: Random, k: int) -> list[str]:
+        """Pick k values uniformly at random (with replacement) in one call."""
+        return rng.choices(self.values, k=k)
 
 
 def get_prompt_vars_dir() -> str:
@@ -47,19 +60,43 @@ def save_prompt_var(variable_name: str, description: str, values: list[str]) ->
     with open(file_path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
     
+    # Make sure the next load picks up the new variable
+    _load_prompt_vars_cached.cache_clear()
+    
     return file_path
 
 
 
+def _prompt_vars_fingerprint(prompt_vars_dir: str) -> tuple[int, int]:
+    """Return the newest mtime and the file count below the prompt_vars directory."""
+    newest = 0
+    count = 0
+    for root, _, files in os.walk(prompt_vars_dir):
+        # A directory's mtime changes when files are added, removed or renamed
+        newest = max(newest, os.stat(root).st_mtime_ns)
+        for file in files:
+            newest = max(newest, os.stat(os.path.join(root, file)).st_mtime_ns)
+            count += 1
+    return newest, count
+
+
 def load_prompt_vars() -> dict[str, PromptVars]:
-    """Load prompt variables from the library/prompt_vars directory"""
+    """Load prompt variables from the library/prompt_vars directory.
 
-    # Get the absolute path to the prompt_vars directory
-    prompt_vars_dir = os.path.abspath(os.path.join(CURRENT_DIR, "library/prompt_vars"))
+    The parsed variables are cached and only re-read when a file in the
+    directory changes. The returned dict is shared, so callers must not modify it.
+    """
+    prompt_vars_dir = get_prompt_vars_dir()
+    if not os.path.exists(prompt_vars_dir):
+        return {}
 
+    return _load_prompt_vars_cached(prompt_vars_dir, _prompt_vars_fingerprint(prompt_vars_dir))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_prompt_vars_cached(prompt_vars_dir: str, fingerprint: tuple[int, int]) -> dict[str, PromptVars]:
+    """Parse every prompt variable file; cached per directory fingerprint."""
     prompt_vars = {}
-    if not os.path.exists(prompt_vars_dir):
-        return prompt_vars
     
     # Walk through all directories and subdirectories
     for root, _, files in os.walk(prompt_vars_dir):
@@ -78,8 +115,9 @@ def load_prompt_vars() -> dict[str, PromptVars]:
                     # File is in a subdirectory
                     prompt_id = f"__{os.path.join(rel_path, os.path.splitext(file)[0])}__"
                 
-                # Replace backslashes with forward slashes for cross-platform compatibility
-                prompt_id = prompt_id.replace("\\", "/")
+                # Replace backslashes with forward slashes for cross-platform compatibility.
+                # Interned so lookups with interned keys can match by identity.
+                prompt_id = sys.intern(prompt_id.replace("\\", "/"))
                 
                 description_lines = []
                 values = []
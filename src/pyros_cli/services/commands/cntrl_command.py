@@ -1,10 +1,8 @@
-from rich.console import Console
 import uuid
 
 from pyros_cli.services.commands.base_command import BaseCommand, CommandResult
 from pyros_cli.models.user_messages import WorkflowProperty
-
-console = Console()
+from pyros_cli.utils.cli_helper import console
 
 class CntrlCommand(BaseCommand):
     """Command to control ComfyUI nodes"""
@@ -1,6 +1,5 @@
 import os
 import questionary
-from rich.console import Console
 import uuid
 
 from pyros_cli.services.commands.base_command import BaseCommand, CommandResult
@@ -9,8 +8,6 @@ from dotenv import load_dotenv, set_key
 from pyros_cli.services.config import _get_env_path
 from pyros_cli.utils.cli_helper import print_success, print_error, print_subheader, print_warning
 
-console = Console()
-
 supported_ai_providers = ["ollama", "openai", "anthropic", "groq", "gemini"]
 
 class ConfigureAiCommand(BaseCommand):
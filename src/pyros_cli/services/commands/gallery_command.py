@@ -1,14 +1,9 @@
 import random
 import questionary
-from rich.console import Console
 
 from pyros_cli.services.commands.base_command import BaseCommand, CommandResult
 from pyros_cli.models.prompt_vars import load_prompt_vars
-from pyros_cli.utils.cli_helper import print_subheader
-
-from pyros_cli.services.gallery import show_gallery
-
-console = Console()
+from pyros_cli.utils.cli_helper import print_subheader, console
 
 class GalleryCommand(BaseCommand):
     """Command to list prompt variables"""
@@ -21,6 +16,10 @@ class GalleryCommand(BaseCommand):
     
     async def execute(self, args: str) -> CommandResult:
         """Show the gallery"""
+        # Imported here: fasthtml, uvicorn and the gallery app are only
+        # needed once the gallery is actually opened
+        from pyros_cli.services.gallery import show_gallery
+
         print_subheader("Opening Gallery")
         gallery_url = show_gallery()
         console.print(f"Gallery is now running at [link={gallery_url}]{gallery_url}[/link]")
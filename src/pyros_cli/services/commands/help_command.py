@@ -1,11 +1,9 @@
-from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
 from pyros_cli.services.commands.base_command import BaseCommand, CommandResult
-
-console = Console()
+from pyros_cli.utils.cli_helper import console
 
 class HelpCommand(BaseCommand):
     """Help command to display available commands"""
@@ -1,14 +1,11 @@
 import random
 import questionary
-from rich.console import Console
 from rich.panel import Panel
 from rich.syntax import Syntax
 
 from pyros_cli.services.commands.base_command import BaseCommand, CommandResult
 from pyros_cli.models.prompt_vars import load_prompt_vars
-from pyros_cli.utils.cli_helper import print_subheader
-
-console = Console()
+from pyros_cli.utils.cli_helper import print_subheader, console
 
 class ListVarsCommand(BaseCommand):
     """Command to list prompt variables"""
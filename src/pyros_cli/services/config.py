@@ -4,11 +4,7 @@ import os
 from pydantic import BaseModel, ValidationError
 from dotenv import load_dotenv, set_key
 import questionary
-from rich.console import Console
-from pyros_cli.utils.cli_helper import print_error, print_success, print_subheader
-import aiohttp # Use aiohttp for async connection check
-
-console = Console()
+from pyros_cli.utils.cli_helper import print_error, print_success, print_subheader, console
 
 
 class ComfyUISettings(BaseModel):
@@ -23,6 +19,8 @@ class ComfyUISettings(BaseModel):
     denoise_node_property: str = "seed" # Default often 'seed'
     ai_provider: str| None = None
     model_name: str| None = None
+    # Skip validation when loading the workflow file (see load_workflow)
+    trust_workflow: bool = False
 
 
     @property
@@ -57,13 +55,14 @@ def load_config() -> ComfyUISettings:
         "denoise_node_property": os.getenv("COMFYUI_DENOISE_NODE_PROPERTY", "seed"),
         "ai_provider": os.getenv("AI_PROVIDER"),
         "model_name": model_name,
+        "trust_workflow": os.getenv("COMFYUI_TRUST_WORKFLOW", "false"),
     }
     try:
         return ComfyUISettings(**settings_data)
     except ValidationError as e:
         print_error(f"Configuration validation error: {e}")
-        # Return default settings on validation error
-        return ComfyUISettings()
+        # Return default settings on validation error (defaults need no validation)
+        return ComfyUISettings.model_construct()
 
 
 def save_config(settings: ComfyUISettings):
@@ -86,24 +85,27 @@ def save_config(settings: ComfyUISettings):
 
 
 async def check_connection(settings: ComfyUISettings) -> bool:
-    """Checks the connection to ComfyUI asynchronously."""
+    """Checks the connection to ComfyUI asynchronously.
+
+    Only probes whether the server accepts TCP connections; no HTTP request
+    is made.
+    """
     url = settings.http_url
     print_subheader(f"Checking connection to {url}...")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=5) as response:
-                if response.status == 200:
-                    print_success("Connection successful!")
-                    return True
-                else:
-                    print_error(f"Connection failed! Status code: {response.status}")
-                    return False
-    except aiohttp.ClientConnectorError:
-        print_error("Connection failed! Host unreachable or wrong port.")
-        return False
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(settings.host, int(settings.port)), timeout=5
+        )
+        writer.close()
+        await writer.wait_closed()
+        print_success("Connection successful!")
+        return True
     except asyncio.TimeoutError:
         print_error("Connection failed! Request timed out.")
         return False
+    except OSError:
+        print_error("Connection failed! Host unreachable or wrong port.")
+        return False
     except Exception as e:
         print_error(f"An unexpected error occurred during connection check: {e}")
         return False
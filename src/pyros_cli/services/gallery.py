@@ -1,8 +1,11 @@
 # gallery_app.py
 from fasthtml.common import *
+import html
 import os
 from pathlib import Path
 import json # To safely inject the list into JavaScript
+from urllib.parse import quote
+from PIL import Image
 from starlette.responses import FileResponse
 from starlette.exceptions import HTTPException
 import threading
@@ -14,10 +17,40 @@ import time
  # --- Configuration ---
 IMAGE_DIR_NAME = "images"
 IMAGE_DIR = Path(IMAGE_DIR_NAME)
+IMAGE_DIR_STR = str(IMAGE_DIR)
 # Add more image extensions if needed
-ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'}
+ALLOWED_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'))
+# Downscaled WebP copies shown in the grid; PhotoSwipe still opens the original
+THUMB_DIR_NAME = "thumbs"
+THUMB_DIR = IMAGE_DIR / THUMB_DIR_NAME
+THUMB_WIDTHS = (400, 800)
+# Vector and animated images are shown as-is
+THUMB_SKIP_EXTENSIONS = frozenset(('.svg', '.gif'))
+# Rendered grid item width for the 3/2/1 column layout in gallery_style
+THUMB_SIZES = "(max-width: 576px) 100vw, (max-width: 992px) 50vw, 33vw"
 # --- End Configuration ---
 
+# Images and thumbnails can be rewritten under the same name (ComfyUI's file
+# counter restarts, thumbnails are regenerated), so browsers must revalidate.
+# FileResponse sends ETag/Last-Modified, so unchanged files cost a 304.
+IMAGE_CACHE_HEADERS = {'Cache-Control': 'no-cache'}
+
+# Static markup for one gallery item; rendered as a plain string per image
+# instead of building FT objects for every file
+GRID_ITEM_TEMPLATE = (
+    '<div class="grid-item">'
+    '<a href="{src}" data-pswp-src="{src}" target="_blank">'
+    '<img src="{src}" alt="{alt}" loading="lazy">'
+    '</a></div>'
+)
+# Variant for images with thumbnails; the original's size is known server-side
+GRID_THUMB_ITEM_TEMPLATE = (
+    '<div class="grid-item">'
+    '<a href="{src}" data-pswp-src="{src}" data-pswp-width="{width}" data-pswp-height="{height}" target="_blank">'
+    '<img src="{thumb}" srcset="{srcset}" sizes="{sizes}" alt="{alt}" loading="lazy">'
+    '</a></div>'
+)
+
 # Check if image directory exists on startup
 # if not IMAGE_DIR.is_dir():
 #     print(f"Error: Image directory '{IMAGE_DIR}' not found.")
@@ -30,6 +63,9 @@ ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'}
 gallery_hdrs = (
     # PhotoSwipe Core CSS
     Link(rel="stylesheet", href="https://unpkg.com/photoswipe@5.4.3/dist/photoswipe.css"),
+    # Start fetching both PhotoSwipe modules at HTML parse time
+    Link(rel="modulepreload", href="https://unpkg.com/photoswipe@5.4.3/dist/photoswipe-lightbox.esm.js"),
+    Link(rel="modulepreload", href="https://unpkg.com/photoswipe@5.4.3/dist/photoswipe.esm.js"),
     # Masonry & imagesLoaded (JS loaded later in the body)
 )
 
@@ -138,8 +174,11 @@ document.addEventListener('DOMContentLoaded', () => {
     //    We still need to prepare for PhotoSwipe dimension detection
 
     // 2. Import PhotoSwipe (requires type="module" which we'll add server-side)
-    import('https://unpkg.com/photoswipe@5.4.3/dist/photoswipe-lightbox.esm.js').then(psLightboxModule => {
-    import('https://unpkg.com/photoswipe@5.4.3/dist/photoswipe.esm.js').then(psModule => {
+    //    Both modules are fetched in parallel rather than one after the other
+    Promise.all([
+        import('https://unpkg.com/photoswipe@5.4.3/dist/photoswipe-lightbox.esm.js'),
+        import('https://unpkg.com/photoswipe@5.4.3/dist/photoswipe.esm.js'),
+    ]).then(([psLightboxModule, psModule]) => {
         const PhotoSwipeLightbox = psLightboxModule.default;
         const PhotoSwipe = psModule.default;
 
@@ -151,8 +190,11 @@ document.addEventListener('DOMContentLoaded', () => {
             galleryElement.querySelectorAll('.grid-item a').forEach(link => {
                 const img = link.querySelector('img');
                 if (img && img.naturalWidth > 0) { // Check if loaded correctly
-                    link.dataset.pswpWidth = img.naturalWidth;
-                    link.dataset.pswpHeight = img.naturalHeight;
+                    // Thumbnail items already carry the original's size from the server
+                    if (!link.dataset.pswpWidth) {
+                        link.dataset.pswpWidth = img.naturalWidth;
+                        link.dataset.pswpHeight = img.naturalHeight;
+                    }
                     
                     // Get the image filename and check if there's a prompt for it
                     const imgSrc = link.getAttribute('href');
@@ -280,8 +322,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if(gallery) gallery.innerHTML = '<p style="text-align: center; color: red;">Error loading some images. Layout may be broken.</p>';
         }); // end imagesLoaded
 
-    }).catch(e => console.error("Failed to load PhotoSwipe Core module:", e));
-    }).catch(e => console.error("Failed to load PhotoSwipe Lightbox module:", e));
+    }).catch(e => console.error("Failed to load PhotoSwipe modules:", e));
 
 }); // End DOMContentLoaded
 """, type="module") # Important: type="module" for PhotoSwipe imports
@@ -290,6 +331,10 @@ document.addEventListener('DOMContentLoaded', () => {
 gallery_server_thread = None
 # Store the gallery port
 gallery_port = None
+# Hold the thumbnail worker thread reference
+thumbnail_thread = None
+# Original (width, height) of every image whose thumbnails are ready
+thumbnail_sizes = {}
 
 def find_free_port():
     """Find a free port to run the gallery server on."""
@@ -301,7 +346,8 @@ def start_server(port):
     """Start the gallery server on the specified port."""
     from uvicorn.config import Config
     from uvicorn.server import Server
-    config = Config(app=app, host="127.0.0.1", port=port)
+    # Keep idle connections open longer so a gallery page can reuse them for all its images
+    config = Config(app=app, host="127.0.0.1", port=port, timeout_keep_alive=30)
     server = Server(config)
     server.run()
 
@@ -319,6 +365,9 @@ def show_gallery():
         print(f"Gallery already running at {url}")
         return
     
+    # Start creating thumbnails while the server boots
+    start_thumbnail_worker(list_image_files())
+
     # Find a free port
     gallery_port = find_free_port()
     
@@ -341,24 +390,100 @@ def show_gallery():
     
     # Return the URL for reference
     return url
-    
+
+
+def has_allowed_extension(filename: str) -> bool:
+    """Check the file extension (case-insensitive) without building a Path."""
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and '.' + extension.lower() in ALLOWED_EXTENSIONS
+
+
+def list_image_files():
+    """Return the sorted names of all servable images in the image directory."""
+    if not IMAGE_DIR.is_dir():
+        return []
+    with os.scandir(IMAGE_DIR) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.is_file() and has_allowed_extension(entry.name)
+        )
+
+
+def thumbnail_widths(image_width):
+    """Thumbnail widths worth creating for an image, i.e. actual downscales."""
+    return [width for width in THUMB_WIDTHS if width < image_width]
+
+
+def thumbnail_url(filename, width):
+    """URL of one thumbnail, percent-encoded so it is safe inside srcset."""
+    return quote(f"/{IMAGE_DIR_NAME}/{THUMB_DIR_NAME}/{filename}_{width}.webp")
+
+
+def needs_thumbnails(filename):
+    """Check whether an image should get thumbnails that are not ready yet."""
+    _, _, extension = filename.rpartition('.')
+    return filename not in thumbnail_sizes and '.' + extension.lower() not in THUMB_SKIP_EXTENSIONS
+
+
+def generate_thumbnails(filename):
+    """Create the WebP thumbnails for one image and record its original size."""
+    source = IMAGE_DIR / filename
+    source_mtime = source.stat().st_mtime
+    with Image.open(source) as img:
+        for width in thumbnail_widths(img.width):
+            thumb_path = THUMB_DIR / f"{filename}_{width}.webp"
+            if thumb_path.exists() and thumb_path.stat().st_mtime >= source_mtime:
+                continue
+            thumb = img.copy()
+            # Bound only the width; thumbnail() keeps the aspect ratio
+            thumb.thumbnail((width, img.height))
+            if thumb.mode not in ("RGB", "RGBA"):
+                thumb = thumb.convert("RGBA")
+            thumb.save(thumb_path, "WEBP", quality=80)
+        thumbnail_sizes[filename] = img.size
+
+
+def generate_missing_thumbnails(filenames):
+    """Create thumbnails for every image that does not have them yet."""
+    THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    for filename in filenames:
+        if not needs_thumbnails(filename):
+            continue
+        try:
+            generate_thumbnails(filename)
+        except Exception as e:
+            print(f"Error creating thumbnails for {filename}: {e}")
+
+
+def start_thumbnail_worker(filenames):
+    """Generate missing thumbnails in a background thread."""
+    global thumbnail_thread
+
+    if thumbnail_thread and thumbnail_thread.is_alive():
+        return
+    missing = [filename for filename in filenames if needs_thumbnails(filename)]
+    if not missing:
+        return
+    thumbnail_thread = threading.Thread(
+        target=generate_missing_thumbnails,
+        args=(missing,),
+        daemon=True
+    )
+    thumbnail_thread.start()
+
 # --- Route Handlers ---
 
 @rt("/")
 def get_gallery():
     """Serves the main gallery page."""
-    image_filenames = []
-    if IMAGE_DIR.is_dir():
-        for filename in os.listdir(IMAGE_DIR):
-            if os.path.isfile(os.path.join(IMAGE_DIR, filename)):
-                # Check extension (case-insensitive)
-                if Path(filename).suffix.lower() in ALLOWED_EXTENSIONS:
-                    image_filenames.append(filename)
-        image_filenames.sort() # Optional: sort alphabetically
-    else:
+    image_filenames = list_image_files()
+    if not IMAGE_DIR.is_dir():
         # Directory doesn't exist, message handled by JS, but log server-side too
         print(f"Warning: Image directory '{IMAGE_DIR}' not found when generating gallery page.")
 
+    # Images without thumbnails yet are shown full size until the worker catches up
+    start_thumbnail_worker(image_filenames)
+
     # Load prompt text files for all images
     prompt_map = {}
     for image_filename in image_filenames:
@@ -376,21 +501,27 @@ def get_gallery():
     # Debug log to see if prompts were loaded
     print(f"Loaded {len(prompt_map)} prompts for {len(image_filenames)} images")
 
-    # Dynamically generate gallery items using FastTags (FTs)
-    gallery_items = []
-    for fname in image_filenames:
-        # The links now point to our image serving route
-        img_path = f"/{IMAGE_DIR_NAME}/{fname}"
-        item = Div(
-            A(Img(src=img_path, alt=fname, loading="lazy"), # Lazy loading for thumbs
-            href=img_path, # Link for PhotoSwipe to full image
-            data_pswp_src=img_path, # Explicit source for PhotoSwipe
-            # data_pswp_width/height will be added by client-side JS
-            target="_blank" # Fallback if JS fails
-            ),
-            cls='grid-item'
+    # Render gallery items straight to HTML; links point to our image serving route.
+    # For full-size items data-pswp-width/height are added by the client-side JS.
+    def render_item(fname):
+        src = html.escape(f"/{IMAGE_DIR_NAME}/{fname}")
+        size = thumbnail_sizes.get(fname)
+        widths = thumbnail_widths(size[0]) if size else None
+        if not widths:
+            return GRID_ITEM_TEMPLATE.format(src=src, alt=html.escape(fname))
+        srcset = [f"{thumbnail_url(fname, width)} {width}w" for width in widths]
+        srcset.append(f"{quote(f'/{IMAGE_DIR_NAME}/{fname}')} {size[0]}w")
+        return GRID_THUMB_ITEM_TEMPLATE.format(
+            src=src,
+            width=size[0],
+            height=size[1],
+            thumb=thumbnail_url(fname, widths[0]),
+            srcset=", ".join(srcset),
+            sizes=THUMB_SIZES,
+            alt=html.escape(fname),
         )
-        gallery_items.append(item)
+
+    gallery_items = NotStr(''.join(render_item(fname) for fname in image_filenames))
 
     # Safely inject the list of filenames and prompt map for client-side JS
     # We point JS to the same image serving route
@@ -406,7 +537,7 @@ def get_gallery():
         H1("Pyro's CLI - Gallery"),
         Div( # The main gallery container for Masonry & PhotoSwipe
             Div(cls="grid-sizer"), # Masonry requires this
-            *gallery_items,        # Unpack the list of generated Divs
+            gallery_items,         # Pre-rendered grid items
             id="gallery",
             cls="image-gallery-container masonry-grid" # Add class for clarity
         ),
@@ -421,24 +552,36 @@ def get_gallery():
 
     return page_content
 
-@rt(f"/{IMAGE_DIR_NAME}/{{filename:path}}")
+IMAGE_ROUTE_PATH = f"/{IMAGE_DIR_NAME}/{{filename:path}}"
+
+
+@rt(IMAGE_ROUTE_PATH)
 async def get_image(filename: str):
     """Serves individual image files securely."""
-    # Basic security check: ensure filename doesn't try directory traversal
-    if ".." in filename or filename.startswith("/"):
+    # Basic security check: cheaply reject obvious directory traversal first
+    if ".." in filename or filename[:1] == "/" or "\x00" in filename:
         raise HTTPException(status_code=404, detail="Not Found")
 
-    file_path = IMAGE_DIR / filename
+    # A symlink inside the image directory can still point outside of it,
+    # so the resolved path must stay under the resolved image directory
+    file_path = IMAGE_DIR_STR + "/" + filename
+    real_path = os.path.realpath(file_path)
+    if not real_path.startswith(os.path.realpath(IMAGE_DIR_STR) + os.sep):
+        raise HTTPException(status_code=404, detail="Not Found")
 
-    # Double check it's a file and exists within the designated directory
-    if file_path.is_file() and str(file_path.resolve()).startswith(str(IMAGE_DIR.resolve())):
-        # Check extension again just to be safe
-        if file_path.suffix.lower() in ALLOWED_EXTENSIONS:
-            return FileResponse(file_path)
+    # Check extension and that it's an existing file
+    if has_allowed_extension(filename) and os.path.isfile(real_path):
+        return FileResponse(file_path, headers=IMAGE_CACHE_HEADERS)
 
     # If any check fails, return 404
     raise HTTPException(status_code=404, detail="Image not found or not allowed")
 
+# fast_app registers a catch-all static file route before ours; move the image
+# route to the front so its checks and cache headers apply to gallery images
+_image_route = next(route for route in app.routes if getattr(route, "path", None) == IMAGE_ROUTE_PATH)
+app.routes.remove(_image_route)
+app.routes.insert(0, _image_route)
+
 
 # --- Run the application ---
 if __name__ == "__main__":
@@ -132,9 +132,10 @@ async def display_terminal_preview(image_bytes: bytes):
         _terminal_supports_images = False
 
 # Modify get_preview_renderable to use the wrapper
-async def get_preview_renderable(image_bytes: bytes) -> Optional[Union[TermImageRenderable, Text]]: # Return type changed
+async def get_preview_renderable(image_bytes: Union[bytes, memoryview]) -> Optional[Union[TermImageRenderable, Text]]: # Return type changed
     """
     Processes image bytes and returns a rich-renderable object (TermImageRenderable or Text).
+    Accepts any bytes-like object, e.g. a memoryview into a WebSocket frame.
     Returns None if processing fails.
     """
     if not image_bytes:
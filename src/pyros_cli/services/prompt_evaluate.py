@@ -1,8 +1,6 @@
 import os
 import importlib
-import inspect
 from typing import Dict, Type
-from rich.console import Console
 
 from pyros_cli.agents.flock_handler import create_flock
 from pyros_cli.globals import CURRENT_DIR
@@ -13,10 +11,12 @@ from pyros_cli.services.commands.help_command import HelpCommand
 from pyros_cli.services.commands.list_vars_command import ListVarsCommand
 from pyros_cli.services.commands.cntrl_command import CntrlCommand
 from pyros_cli.services.config import load_config
-from pyros_cli.services.prompt_substitution import substitute_prompt_vars
+from pyros_cli.services.prompt_substitution import substitute_prompt_vars_async
 from pyros_cli.models.user_messages import WorkflowProperty
+from pyros_cli.utils.cli_helper import console
 
-console = Console()
+# Skip these files when scanning for commands
+SKIP_COMMAND_FILES = frozenset(("__init__.py", "base_command.py", "help_command.py", "list_vars_command.py"))
 
 class CommandRegistry:
     """Registry for all available commands"""
@@ -40,28 +40,28 @@ class CommandRegistry:
 
     def load_commands_from_directory(self, directory="services/commands"):
         """Load commands from the commands directory"""
-        # Skip these files when scanning for commands
-        skip_files = ["__init__.py", "base_command.py", "help_command.py", "list_vars_command.py"]
-
         # Get the absolute path to the commands directory
         commands_dir = os.path.abspath(os.path.join(CURRENT_DIR, directory))
+        command_files = (
+            filename for filename in os.listdir(commands_dir)
+            if filename.endswith(".py") and filename not in SKIP_COMMAND_FILES
+        )
         
-        for filename in os.listdir(commands_dir):
-            if filename.endswith(".py") and filename not in skip_files:
-                module_name = filename[:-3]  # Remove .py extension
-                module_path = f"pyros_cli.services.commands.{module_name}"
+        for filename in command_files:
+            module_name = filename[:-3]  # Remove .py extension
+            module_path = f"pyros_cli.services.commands.{module_name}"
+            
+            try:
+                module = importlib.import_module(module_path)
                 
-                try:
-                    module = importlib.import_module(module_path)
-                    
-                    # Find command classes in the module
-                    for _, obj in inspect.getmembers(module):
-                        if (inspect.isclass(obj) and 
-                            issubclass(obj, BaseCommand) and 
-                            obj is not BaseCommand):
-                            self.register_command(obj)
-                except Exception as e:
-                    console.print(f"Error loading command module {module_path}: {e}", style="red")
+                # Find command classes defined or imported at module level
+                for obj in vars(module).values():
+                    if (isinstance(obj, type) and 
+                        issubclass(obj, BaseCommand) and 
+                        obj is not BaseCommand):
+                        self.register_command(obj)
+            except Exception as e:
+                console.print(f"Error loading command module {module_path}: {e}", style="red")
         
     async def evaluate(self, user_input: str) -> CommandResult:
         """Evaluate user input to check if it's a command or plain text"""
@@ -96,7 +96,7 @@ class CommandRegistry:
         config = load_config()
         if config.model_name and ">" in user_input:
             user_input = evaluate_agents(user_input)
-        processed_prompt = substitute_prompt_vars(user_input)
+        processed_prompt = await substitute_prompt_vars_async(user_input, verbose=True)
         
         # If the prompt was modified, return it in the data field
         if processed_prompt != user_input:
@@ -115,13 +115,15 @@ def evaluate_agents(user_input: str) -> str:
     Returns:
         The enhanced prompt string
     """
+    prompt, _, agent_instruction = user_input.partition(">")
+    prompt = prompt.strip()
+
     config = load_config()
     if not config.model_name:
         console.print("[yellow]Warning: No AI model configured. Skipping agent enhancement.[/yellow]")
-        return user_input.split(">")[0].strip()
+        return prompt
     
-    prompt = user_input.split(">")[0].strip()
-    agent_instruction = user_input.split(">")[1].strip()
+    agent_instruction = agent_instruction.strip()
     
     enhanced_prompt = create_flock(
         model=config.model_name,
@@ -1,93 +1,311 @@
 import asyncio
 import random
 import re
-from rich.console import Console
+import sys
+import uuid
+from collections import Counter
+from flock import Flock
+from loguru import logger
 
+from pyros_cli.agents.prompt_var_generator_agent import register_prompt_var_generator_agent
+from pyros_cli.models.flock_artifacts import (
+    PromptVarGenerationRequest,
+    GeneratedPromptVar,
+)
 from pyros_cli.models.prompt_vars import load_prompt_vars, save_prompt_var
+from pyros_cli.services.config import load_config
+from pyros_cli.utils.cli_helper import console
 
-console = Console()
+# How deep variables nested inside variable values are expanded
+MAX_NESTING_DEPTH = 10
 
+# Random source for picking variable values
+_rng = random.Random()
 
-async def generate_missing_prompt_var(variable_name: str, full_prompt: str) -> list[str] | None:
-    """Generate values for a missing prompt variable using AI.
+# Flock instances with the prompt var generator agent registered, per model name
+_FLOCK_CACHE: dict[str, Flock] = {}
+
+
+def _get_prompt_var_flock(model_name: str) -> Flock:
+    """Return the cached Flock for model_name, creating it on first use."""
+    flock = _FLOCK_CACHE.get(model_name)
+    if flock is None:
+        flock = Flock(model=model_name)
+        register_prompt_var_generator_agent(flock)
+        _FLOCK_CACHE[model_name] = flock
+    return flock
+
+# Pattern to find __variable__ or __variable:index__ in the prompt
+# Includes slashes for subfolder paths and optional index specification.
+# Group 1 is the raw variable name, group 2 the index (or None).
+_VAR_RE = re.compile(r'__([a-zA-Z0-9_\-/]+)(?::(\d+))?__')
+
+
+async def generate_missing_prompt_vars(variable_names: list[str], full_prompt: str) -> dict[str, list[str]]:
+    """Generate values for several missing prompt variables in a single Flock run.
+    
+    All requests are published into one Flock before it is run, so the
+    variables are generated together instead of one full agent run each.
     
     Args:
-        variable_name: The variable name without underscores (e.g., 'cat_race')
+        variable_names: Variable names without underscores (e.g., ['cat_race', 'color'])
         full_prompt: The complete prompt for context
         
     Returns:
-        List of generated values, or None if generation failed
+        Mapping of variable name to generated values. Variables that could
+        not be generated are left out.
     """
-    # Import here to avoid circular imports
-    from flock import Flock
-    from pyros_cli.agents.prompt_var_generator_agent import register_prompt_var_generator_agent
-    from pyros_cli.models.flock_artifacts import (
-        PromptVarGenerationRequest,
-        GeneratedPromptVar,
-    )
-    from pyros_cli.services.config import load_config
+    if not variable_names:
+        return {}
     
     config = load_config()
     if not config.model_name:
         console.print("[yellow]Warning: No AI model configured. Cannot generate prompt variable.[/yellow]")
-        return None
+        return {}
     
-    console.print(f"\n[bold cyan]🤖 Generating values for missing variable: __{variable_name}__[/bold cyan]")
-    console.print(f"[dim]Using AI to create ~20 values based on prompt context...[/dim]\n")
+    names_text = ", ".join(f"__{name}__" for name in variable_names)
+    console.print(f"\n[bold cyan]🤖 Generating values for missing variable(s): {names_text}[/bold cyan]")
+    console.print(f"[dim]Using AI to create ~20 values per variable based on prompt context...[/dim]\n")
     
+    generated_values: dict[str, list[str]] = {}
     try:
-        flock = Flock(model=config.model_name)
-        register_prompt_var_generator_agent(flock)
+        flock = _get_prompt_var_flock(config.model_name)
         
-        # Publish the generation request
-        request = PromptVarGenerationRequest(
-            variable_name=variable_name,
-            full_prompt=full_prompt
-        )
-        await flock.publish(request)
+        # Publish one generation request per variable, then run them all at once.
+        # The Flock is reused across calls, so each request gets its own
+        # correlation id to tell its result apart from earlier ones.
+        correlation_ids = {name: uuid.uuid4().hex for name in variable_names}
+        await asyncio.gather(*(
+            flock.publish(
+                PromptVarGenerationRequest(
+                    variable_name=name,
+                    full_prompt=full_prompt
+                ),
+                correlation_id=correlation_id
+            )
+            for name, correlation_id in correlation_ids.items()
+        ))
         await flock.run_until_idle()
         
-        # Get the result
-        results = await flock.store.get_by_type(GeneratedPromptVar)
-        if results:
-            generated = results[0]
+        # Map the results back to the requested variables
+        for name, correlation_id in correlation_ids.items():
+            results = await flock.store.get_by_type(
+                GeneratedPromptVar, correlation_id=correlation_id
+            )
+            if not results:
+                continue
+            generated = results[-1]
             
             # Save to disk
             file_path = save_prompt_var(
-                variable_name=variable_name,
+                variable_name=name,
                 description=generated.description,
                 values=generated.values
             )
             
-            console.print(f"[green]✓ Generated {len(generated.values)} values for __{variable_name}__[/green]")
+            console.print(f"[green]✓ Generated {len(generated.values)} values for __{name}__[/green]")
             console.print(f"[dim]Saved to: {file_path}[/dim]\n")
             
-            return generated.values
-        else:
-            console.print("[red]✗ Failed to generate values - no result from AI[/red]")
-            return None
+            generated_values[name] = generated.values
             
     except Exception as e:
         console.print(f"[red]✗ Error generating prompt variable: {e}[/red]")
-        return None
+        return generated_values
+    
+    for name in variable_names:
+        if name not in generated_values:
+            console.print(f"[red]✗ Failed to generate values for __{name}__ - no result from AI[/red]")
+    
+    return generated_values
 
 
-def _run_async(coro):
-    """Run an async coroutine synchronously."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If we're already in an async context, create a new task
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, coro)
-                return future.result()
-        else:
-            return loop.run_until_complete(coro)
-    except RuntimeError:
-        return asyncio.run(coro)
+async def generate_missing_prompt_var(variable_name: str, full_prompt: str) -> list[str] | None:
+    """Generate values for a missing prompt variable using AI.
+    
+    Args:
+        variable_name: The variable name without underscores (e.g., 'cat_race')
+        full_prompt: The complete prompt for context
+        
+    Returns:
+        List of generated values, or None if generation failed
+    """
+    generated = await generate_missing_prompt_vars([variable_name], full_prompt)
+    return generated.get(variable_name)
+
+
+def _warn(message: str, verbose: bool) -> None:
+    """Show a warning on the console in verbose mode, otherwise log it at debug level."""
+    if verbose:
+        console.print(f"[yellow]Warning: {message}[/yellow]")
+    else:
+        logger.debug(message)
+
+
+def _find_missing_vars(texts, prompt_vars: dict) -> list[str]:
+    """Return the raw names of all variables used in texts but not loaded, in order."""
+    return list(dict.fromkeys(
+        match.group(1)
+        for text in texts
+        for match in _VAR_RE.finditer(text)
+        if f"__{match.group(1)}__" not in prompt_vars
+    ))
+
+
+def _sample_random_values(text: str, prompt_vars: dict) -> dict:
+    """Draw the random values for all non-indexed tokens in text up front.
+    
+    Each variable gets a single draw covering all of its occurrences
+    instead of one random pick per token.
+    """
+    counts = Counter(
+        match.group(1)
+        for match in _VAR_RE.finditer(text)
+        if match.group(2) is None
+    )
+    samples = {}
+    for raw_var_name, count in counts.items():
+        var = prompt_vars.get(f"__{raw_var_name}__")
+        if var is not None and var.values:
+            if count == 1:
+                samples[raw_var_name] = iter((var.random(_rng),))
+            else:
+                samples[raw_var_name] = iter(var.sample(_rng, count))
+    return samples
+
+
+def _substitute_text(
+    text: str, prompt_vars: dict, verbose: bool, resolved: dict, depth: int = 0
+) -> str:
+    """Replace every variable token in text, leaving unknown ones as-is.
+    
+    Values that themselves contain variables are expanded recursively
+    before they are inserted, up to MAX_NESTING_DEPTH levels deep, so only
+    the inserted text is ever rescanned.
+    
+    Indexed tokens always resolve to the same value, so their replacements
+    are memoized in resolved, keyed by (variable name, index).
+    """
+    random_values = _sample_random_values(text, prompt_vars)
+
+    def _expand(replacement: str) -> str:
+        """Substitute any variables nested inside a replacement value."""
+        if depth < MAX_NESTING_DEPTH and "__" in replacement and _VAR_RE.search(replacement):
+            return _substitute_text(replacement, prompt_vars, verbose, resolved, depth + 1)
+        return replacement
+
+    def _resolve(match: re.Match) -> str:
+        """Return the replacement for one variable token, or the token itself."""
+        token = match.group(0)
+        raw_var_name, index_str = match.groups()
+        # Interned like the loaded keys, so the dict lookup matches by identity
+        var_name = sys.intern(f"__{raw_var_name}__")
+        index = int(index_str) if index_str is not None else None
+
+        if index is not None and (raw_var_name, index) in resolved:
+            replacement = resolved[raw_var_name, index]
+            # An out-of-range index is memoized as the token itself
+            return token if replacement == token else _expand(replacement)
+
+        if var_name not in prompt_vars:
+            if index is None:
+                # Variable doesn't exist (generation failed or disabled)
+                _warn(f"Unknown variable {var_name} - leaving as-is", verbose)
+            return token
+
+        var = prompt_vars[var_name]
+        if not var.values:
+            return token
+
+        if index is None:
+            # Take the next pre-sampled random value for this variable
+            replacement = next(random_values[raw_var_name])
+            if verbose:
+                console.print(f"[dim]Substituted {var_name} with random value: {replacement}[/dim]")
+            return _expand(replacement)
+
+        if 0 <= index < len(var.values):
+            # Use the value at the specified index
+            replacement = var.values[index]
+            if verbose:
+                console.print(f"[dim]Substituted {token} with value at index {index}: {replacement}[/dim]")
+            resolved[raw_var_name, index] = replacement
+            return _expand(replacement)
+
+        # Index out of range
+        _warn(f"Index {index} out of range for {var_name} (has {len(var.values)} values)", verbose)
+        resolved[raw_var_name, index] = token
+        return token
+
+    return _VAR_RE.sub(_resolve, text)
 
-def substitute_prompt_vars(prompt: str, auto_generate: bool = True) -> str:
+
+async def substitute_prompt_vars_batch_async(
+    prompts: list[str], auto_generate: bool = True, verbose: bool = False
+) -> list[str]:
+    """
+    Substitute prompt variables in several prompts at once.
+    
+    Prompt variables are loaded once for the whole batch, and variables
+    missing from any of the prompts are generated together in a single AI
+    run, using all prompts as context.
+    
+    Args:
+        prompts: The user prompt texts
+        auto_generate: If True, generate missing variables using AI
+        verbose: If True, print each substitution and warnings to the console;
+            otherwise warnings only go to the log
+        
+    Returns:
+        The prompts with all variables substituted, in the same order
+    """
+    results = list(prompts)
+    # Fast path: a prompt without "__" cannot contain any variables, and
+    # search() stops at the first valid token for the rest
+    pending = [
+        i for i, prompt in enumerate(prompts)
+        if "__" in prompt and _VAR_RE.search(prompt)
+    ]
+    if not pending:
+        return results
+
+    # Load all prompt variables
+    prompt_vars = load_prompt_vars()
+    context = "\n".join(prompts[i] for i in pending)
+    # Variables already handed to the AI, so failed ones aren't retried every pass
+    attempted = set()
+    # Memoized replacements for indexed tokens, shared by the whole batch
+    resolved = {}
+
+    while True:
+        if auto_generate:
+            # Collect missing variables up front instead of generating per token
+            missing = [
+                name for name in _find_missing_vars((results[i] for i in pending), prompt_vars)
+                if name not in attempted
+            ]
+            attempted.update(missing)
+            if missing and await generate_missing_prompt_vars(missing, context):
+                # Reload prompt vars to include the newly generated ones
+                prompt_vars = load_prompt_vars()
+
+        for i in pending:
+            results[i] = _substitute_text(results[i], prompt_vars, verbose, resolved)
+
+        if not auto_generate:
+            break
+        # Nested values can surface variables that weren't in the prompts;
+        # go again only for prompts with such not yet attempted variables
+        pending = [
+            i for i in pending
+            if any(name not in attempted for name in _find_missing_vars([results[i]], prompt_vars))
+        ]
+        if not pending:
+            break
+
+    return results
+
+
+async def substitute_prompt_vars_async(prompt: str, auto_generate: bool = True, verbose: bool = False) -> str:
     """
     Substitute prompt variables in the format __varname__ with random values
     from the corresponding prompt variable collection.
@@ -100,106 +318,80 @@ def substitute_prompt_vars(prompt: str, auto_generate: bool = True) -> str:
     Args:
         prompt: The user prompt text
         auto_generate: If True, generate missing variables using AI
+        verbose: If True, print each substitution and warnings to the console;
+            otherwise warnings only go to the log
         
     Returns:
         The prompt with all variables substituted
     """
-    # Load all prompt variables
-    prompt_vars = load_prompt_vars()
+    # Fast path: a prompt without "__" cannot contain any variables
+    if "__" not in prompt:
+        return prompt
+    # search() stops at the first valid token instead of collecting them all
+    if not _VAR_RE.search(prompt):
+        return prompt
+
+    results = await substitute_prompt_vars_batch_async([prompt], auto_generate, verbose)
+    return results[0]
+
+
+def _run_sync(async_func, *args):
+    """Run an async substitution function from synchronous code.
     
-    # Pattern to find __variable__ or __variable:index__ in the prompt
-    # Updated to include slashes for subfolder paths and optional index specification
-    pattern = r'(__[a-zA-Z0-9_\-/]+(?::\d+)?__)'
+    Raises:
+        RuntimeError: If called from inside a running event loop
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(async_func(*args))
+    raise RuntimeError(
+        f"{async_func.__name__.removesuffix('_async')}() cannot be called from a running "
+        f"event loop; use 'await {async_func.__name__}()' instead"
+    )
+
+
+def substitute_prompt_vars(prompt: str, auto_generate: bool = True, verbose: bool = False) -> str:
+    """
+    Synchronous version of substitute_prompt_vars_async.
     
-    # Keep substituting until no more matches are found
-    substituted_prompt = prompt
-    max_iterations = 10  # Prevent infinite loops
-    iteration = 0
+    Must not be called while an event loop is running; async callers
+    should await substitute_prompt_vars_async instead.
     
-    while iteration < max_iterations:
-        iteration += 1
-        matches = re.findall(pattern, substituted_prompt)
+    Args:
+        prompt: The user prompt text
+        auto_generate: If True, generate missing variables using AI
+        verbose: If True, print each substitution and warnings to the console;
+            otherwise warnings only go to the log
         
-        if not matches:
-            # No more variables to substitute
-            break
-            
-        # Track if we made any substitutions in this iteration
-        made_substitution = False
+    Returns:
+        The prompt with all variables substituted
         
-        for match in matches:
-            # Check if this is an indexed variable reference
-            if ":" in match:
-                # Parse the variable name and index
-                var_parts = match.split(":")
-                var_name = var_parts[0] + "__"  # Add back the closing underscores
-                # Extract index and remove trailing "__"
-                index_str = var_parts[1].rstrip("_")
-                try:
-                    index = int(index_str)
-                except ValueError:
-                    # Invalid index format, skip this variable
-                    continue
-                
-                # Find the base variable (or generate if missing)
-                if var_name not in prompt_vars and auto_generate:
-                    # Extract the raw variable name (without underscores)
-                    raw_var_name = var_name.strip("_")
-                    generated_values = _run_async(
-                        generate_missing_prompt_var(raw_var_name, prompt)
-                    )
-                    if generated_values:
-                        # Reload prompt vars to include the newly generated one
-                        prompt_vars = load_prompt_vars()
-                
-                if var_name in prompt_vars:
-                    var = prompt_vars[var_name]
-                    if var.values:
-                        if 0 <= index < len(var.values):
-                            # Use the value at the specified index
-                            replacement = var.values[index]
-                            # Replace the variable with the indexed value
-                            substituted_prompt = substituted_prompt.replace(match, replacement, 1)
-                            made_substitution = True
-                            # Log the substitution
-                            console.print(f"[dim]Substituted {match} with value at index {index}: {replacement}[/dim]")
-                        else:
-                            # Index out of range
-                            console.print(f"[yellow]Warning: Index {index} out of range for {var_name} (has {len(var.values)} values)[/yellow]")
-            else:
-                # Regular variable without index
-                var_name = match
-                
-                # Check if variable exists, if not try to generate it
-                if var_name not in prompt_vars and auto_generate:
-                    # Extract the raw variable name (without underscores)
-                    raw_var_name = var_name.strip("_")
-                    generated_values = _run_async(
-                        generate_missing_prompt_var(raw_var_name, prompt)
-                    )
-                    if generated_values:
-                        # Reload prompt vars to include the newly generated one
-                        prompt_vars = load_prompt_vars()
-                
-                if var_name in prompt_vars:
-                    var = prompt_vars[var_name]
-                    if var.values:
-                        # Select a random value from the variable's values
-                        replacement = random.choice(var.values)
-                        
-                        # Replace the variable with the random value
-                        substituted_prompt = substituted_prompt.replace(var_name, replacement, 1)
-                        made_substitution = True
-                        
-                        # Log the substitution
-                        console.print(f"[dim]Substituted {var_name} with random value: {replacement}[/dim]")
-                else:
-                    # Variable still doesn't exist after generation attempt
-                    console.print(f"[yellow]Warning: Unknown variable {var_name} - leaving as-is[/yellow]")
-            
-        # If we didn't make any substitutions in this iteration, break
-        # (This handles cases where variable names don't match any prompt vars)
-        if not made_substitution:
-            break
+    Raises:
+        RuntimeError: If called from inside a running event loop
+    """
+    return _run_sync(substitute_prompt_vars_async, prompt, auto_generate, verbose)
+
+
+def substitute_prompt_vars_batch(
+    prompts: list[str], auto_generate: bool = True, verbose: bool = False
+) -> list[str]:
+    """
+    Synchronous version of substitute_prompt_vars_batch_async.
+    
+    Must not be called while an event loop is running; async callers
+    should await substitute_prompt_vars_batch_async instead.
     
-    return substituted_prompt
\ No newline at end of file
+    Args:
+        prompts: The user prompt texts
+        auto_generate: If True, generate missing variables using AI
+        verbose: If True, print each substitution and warnings to the console;
+            otherwise warnings only go to the log
+        
+    Returns:
+        The prompts with all variables substituted, in the same order
+        
+    Raises:
+        RuntimeError: If called from inside a running event loop
+    """
+    return _run_sync(substitute_prompt_vars_batch_async, prompts, auto_generate, verbose)
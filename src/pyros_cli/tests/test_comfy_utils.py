@@ -0,0 +1,178 @@
+"""Tests for ComfyUI workflow helpers."""
+
+import json
+import os
+
+import pytest
+
+from pyros_cli.models.user_messages import UserMessages, WorkflowProperty
+from pyros_cli.services.config import ComfyUISettings
+from rich.progress import Progress
+from rich.text import Text
+
+from pyros_cli.utils.comfy_utils import (
+    _MESSAGE_HANDLERS, _ListenState, load_workflow, make_updater, update_workflow
+)
+
+
+WORKFLOW = {
+    "1": {"inputs": {"text": "a cat"}, "class_type": "CLIPTextEncode"},
+    "2": {"inputs": {"seed": 1, "clip": ["1", 0]}, "class_type": "KSampler"},
+}
+
+
+@pytest.fixture
+def workflow_file(tmp_path):
+    """Write a small workflow to disk and start from an empty cache."""
+    load_workflow.cache_clear()
+    path = tmp_path / "workflow.json"
+    path.write_text(json.dumps(WORKFLOW))
+    yield str(path)
+    load_workflow.cache_clear()
+
+
+class TestLoadWorkflow:
+    """Tests for load_workflow caching."""
+
+    def test_unchanged_file_is_cached(self, workflow_file):
+        """Loading the same unchanged file returns the cached workflow."""
+        first = load_workflow(workflow_file)
+        assert load_workflow(workflow_file) is first
+        assert first.root["1"].class_type == "CLIPTextEncode"
+
+    def test_changed_file_is_reloaded(self, workflow_file):
+        """A modified file is parsed again."""
+        first = load_workflow(workflow_file)
+
+        changed = dict(WORKFLOW, **{"3": {"inputs": {}, "class_type": "SaveImage"}})
+        with open(workflow_file, "w") as f:
+            json.dump(changed, f)
+        stat = os.stat(workflow_file)
+        os.utime(workflow_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        second = load_workflow(workflow_file)
+        assert second is not first
+        assert "3" in second.root
+
+    def test_trusted_skips_validation(self, workflow_file):
+        """Trusted loading keeps the raw nodes and is cached separately."""
+        trusted = load_workflow(workflow_file, trusted=True)
+        assert trusted.root == WORKFLOW
+        assert load_workflow(workflow_file, trusted=True) is trusted
+        assert load_workflow(workflow_file) is not trusted
+
+    def test_missing_file_raises(self, tmp_path):
+        """A missing workflow file still raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            load_workflow(str(tmp_path / "missing.json"))
+
+
+class TestMakeUpdater:
+    """Tests for make_updater."""
+
+    def test_updates_prompt_seed_and_properties(self, workflow_file):
+        """Each call sets prompt and seed; the loaded workflow stays untouched."""
+        workflow = load_workflow(workflow_file)
+        settings = ComfyUISettings(prompt_node_id="1", denoise_node_id="2")
+        user_messages = UserMessages(
+            base_prompt="", evaluated_prompt="", command="", history=[],
+            workflow_properties=[WorkflowProperty(node_id="2", node_property="steps", value="20", alias="steps")]
+        )
+
+        update = make_updater(workflow, settings, user_messages)
+        first = update("a dog", 7)
+        assert first["1"]["inputs"]["text"] == "a dog"
+        assert first["2"]["inputs"] == {"seed": 7, "clip": ["1", 0], "steps": "20"}
+
+        second = update("a bird", 8)
+        assert second["1"]["inputs"]["text"] == "a bird"
+        assert second["2"]["inputs"]["seed"] == 8
+
+        assert workflow._raw == WORKFLOW
+
+    def test_properties_override_prompt_and_seed(self, workflow_file):
+        """A workflow property on the prompt or seed input wins over the call's values."""
+        workflow = load_workflow(workflow_file)
+        settings = ComfyUISettings(prompt_node_id="1", denoise_node_id="2")
+        user_messages = UserMessages(
+            base_prompt="", evaluated_prompt="", command="", history=[],
+            workflow_properties=[
+                WorkflowProperty(node_id="2", node_property="seed", value="42", alias="seed"),
+                WorkflowProperty(node_id="1", node_property="text", value="fixed", alias="text"),
+            ]
+        )
+
+        update = make_updater(workflow, settings, user_messages)
+        for seed in (999, 1000):
+            workflow_dict = update("a dog", seed)
+            assert workflow_dict["2"]["inputs"]["seed"] == "42"
+            assert workflow_dict["1"]["inputs"]["text"] == "fixed"
+
+
+class TestUpdateWorkflow:
+    """Tests for update_workflow."""
+
+    def test_returns_independent_dicts(self, workflow_file):
+        """Each call returns its own dict; properties still win over the seed."""
+        workflow = load_workflow(workflow_file)
+        settings = ComfyUISettings(prompt_node_id="1", denoise_node_id="2")
+        user_messages = UserMessages(
+            base_prompt="", evaluated_prompt="", command="", history=[], workflow_properties=[]
+        )
+
+        first = update_workflow(workflow, "a dog", 1, settings, user_messages)
+        second = update_workflow(workflow, "a dog", 2, settings, user_messages)
+        assert second is not first
+        assert first["2"]["inputs"]["seed"] == 1
+        assert second["2"]["inputs"]["seed"] == 2
+
+        user_messages.workflow_properties.append(
+            WorkflowProperty(node_id="2", node_property="seed", value="42", alias="seed")
+        )
+        third = update_workflow(workflow, "a dog", 3, settings, user_messages)
+        assert third["2"]["inputs"]["seed"] == "42"
+
+
+class TestMessageHandlers:
+    """Tests for the WebSocket message handlers."""
+
+    def test_progress_then_finish(self):
+        """Progress creates the task once; our prompt finishing completes it."""
+        state = _ListenState(prompt_id="p1", progress=Progress(), status_text=Text())
+
+        _MESSAGE_HANDLERS['executing']({"node": "3", "prompt_id": "p1"}, state)
+        _MESSAGE_HANDLERS['progress']({"value": 1, "max": 4}, state)
+        _MESSAGE_HANDLERS['progress']({"value": 2, "max": 4}, state)
+        assert len(state.progress.tasks) == 1
+        assert state.progress_task.completed == 2
+
+        # Other prompts are ignored
+        _MESSAGE_HANDLERS['executing']({"node": None, "prompt_id": "other"}, state)
+        assert not state.done
+
+        _MESSAGE_HANDLERS['executing']({"node": None, "prompt_id": "p1"}, state)
+        assert state.done
+        assert state.progress_task.finished
+        assert state.status_text.plain == "Execution finished for prompt ID: p1"
+
+    def test_progress_of_other_prompts_ignored(self):
+        """Progress for another prompt, or untagged before ours runs, is dropped."""
+        state = _ListenState(prompt_id="p1", progress=Progress(), status_text=Text())
+
+        _MESSAGE_HANDLERS['progress']({"value": 1, "max": 4}, state)
+        _MESSAGE_HANDLERS['executing']({"node": "3", "prompt_id": "other"}, state)
+        _MESSAGE_HANDLERS['progress']({"value": 1, "max": 4, "prompt_id": "other"}, state)
+        assert not state.running
+        assert state.progress_task is None
+
+        _MESSAGE_HANDLERS['executing']({"node": "3", "prompt_id": "p1"}, state)
+        _MESSAGE_HANDLERS['progress']({"value": 2, "max": 4, "prompt_id": "other"}, state)
+        assert state.progress_task is None
+        _MESSAGE_HANDLERS['progress']({"value": 3, "max": 4, "prompt_id": "p1"}, state)
+        assert state.progress_task.completed == 3
+
+    def test_status_without_exec_info(self):
+        """A status message without details reports an empty queue."""
+        state = _ListenState(prompt_id="p1", progress=Progress(), status_text=Text())
+        _MESSAGE_HANDLERS['status']({}, state)
+        assert state.status_text.plain == "Queue status: 0 remaining"
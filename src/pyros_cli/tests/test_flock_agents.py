@@ -439,3 +439,22 @@ class TestSavePromptVar:
             assert "Siamese" in content
             assert "Maine Coon" in content
 
+
+    def test_save_prompt_var_refreshes_loaded_vars(self, tmp_path):
+        """Test that a saved variable is visible to the next load despite caching."""
+        from pyros_cli.models.prompt_vars import save_prompt_var, load_prompt_vars
+        
+        with patch('pyros_cli.models.prompt_vars.get_prompt_vars_dir') as mock_dir:
+            mock_dir.return_value = str(tmp_path)
+            
+            assert "__cat_breed__" not in load_prompt_vars()
+            
+            save_prompt_var(
+                variable_name="cat_breed",
+                description="Different cat breeds",
+                values=["Persian", "Siamese"]
+            )
+            
+            prompt_vars = load_prompt_vars()
+            assert "__cat_breed__" in prompt_vars
+            assert prompt_vars["__cat_breed__"].values == ("Persian", "Siamese")
@@ -1,88 +1,144 @@
-import unittest
-from unittest.mock import patch, MagicMock
-import sys
-import os
+"""Tests for prompt variable substitution."""
 
-# Add the src directory to the Python path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+import asyncio
+from unittest.mock import MagicMock, AsyncMock, patch
 
-from pyros_cli.services.prompt_substitution import substitute_prompt_vars
+import pytest
+
+from pyros_cli.services.prompt_substitution import (
+    substitute_prompt_vars,
+    substitute_prompt_vars_async,
+    substitute_prompt_vars_batch,
+)
 from pyros_cli.models.prompt_vars import PromptVars
 
-class TestPromptSubstitution(unittest.TestCase):
-    @patch('pyros_cli.services.prompt_substitution.load_prompt_vars')
-    @patch('pyros_cli.services.prompt_substitution.console')
-    def test_basic_variable_substitution(self, mock_console, mock_load_vars):
-        # Mock the prompt_vars dictionary
-        test_vars = {
-            "__test__": PromptVars(
-                prompt_id="__test__",
-                file_path="test.txt",
-                description="Test variable",
-                values=["value1", "value2", "value3"]
-            )
-        }
-        mock_load_vars.return_value = test_vars
-        
-        # Test with a fixed seed for deterministic random choice
-        with patch('random.choice', return_value="value1"):
-            result = substitute_prompt_vars("This is a __test__ prompt")
-            self.assertEqual(result, "This is a value1 prompt")
-    
-    @patch('pyros_cli.services.prompt_substitution.load_prompt_vars')
-    @patch('pyros_cli.services.prompt_substitution.console')
-    def test_indexed_variable_substitution(self, mock_console, mock_load_vars):
-        # Mock the prompt_vars dictionary
-        test_vars = {
-            "__test__": PromptVars(
-                prompt_id="__test__",
-                file_path="test.txt",
-                description="Test variable",
-                values=["value1", "value2", "value3"]
-            )
-        }
-        mock_load_vars.return_value = test_vars
-        
-        # Test using specific indices
+
+def make_var(prompt_id: str, values: list[str], description: str = "Test variable") -> PromptVars:
+    """Build a prompt variable as load_prompt_vars would return it."""
+    return PromptVars(
+        prompt_id=prompt_id,
+        file_path=f"{prompt_id.strip('_')}.txt",
+        description=description,
+        values=values
+    )
+
+
+@pytest.fixture(autouse=True)
+def _silent_console(monkeypatch):
+    """Keep substitution output off the real console."""
+    monkeypatch.setattr("pyros_cli.services.prompt_substitution.console", MagicMock())
+
+
+@pytest.fixture
+def mock_load_vars(monkeypatch):
+    """Patch load_prompt_vars; no variables are known until a test sets some."""
+    mock = MagicMock(return_value={})
+    monkeypatch.setattr("pyros_cli.services.prompt_substitution.load_prompt_vars", mock)
+    return mock
+
+
+@pytest.fixture
+def test_vars(mock_load_vars):
+    """Provide a single __test__ variable with three values."""
+    prompt_vars = {"__test__": make_var("__test__", ["value1", "value2", "value3"])}
+    mock_load_vars.return_value = prompt_vars
+    return prompt_vars
+
+
+@pytest.fixture
+def mock_generate(monkeypatch):
+    """Patch AI generation of missing variables; it produces nothing."""
+    mock = AsyncMock(return_value={})
+    monkeypatch.setattr("pyros_cli.services.prompt_substitution.generate_missing_prompt_vars", mock)
+    return mock
+
+
+class TestPromptSubstitution:
+    """Tests for substitute_prompt_vars and its variants."""
+
+    def test_basic_variable_substitution(self, test_vars):
+        # Make the random pick deterministic
+        with patch('pyros_cli.services.prompt_substitution._rng.randrange', return_value=0):
+            assert substitute_prompt_vars("This is a __test__ prompt") == "This is a value1 prompt"
+
+    def test_indexed_variable_substitution(self, test_vars):
         result = substitute_prompt_vars("First: __test:0__ Second: __test:1__ Third: __test:2__")
-        self.assertEqual(result, "First: value1 Second: value2 Third: value3")
-    
-    @patch('pyros_cli.services.prompt_substitution.load_prompt_vars')
-    @patch('pyros_cli.services.prompt_substitution.console')
-    def test_invalid_index(self, mock_console, mock_load_vars):
-        # Mock the prompt_vars dictionary
-        test_vars = {
-            "__test__": PromptVars(
-                prompt_id="__test__",
-                file_path="test.txt",
-                description="Test variable",
-                values=["value1", "value2", "value3"]
-            )
-        }
-        mock_load_vars.return_value = test_vars
-        
-        # Test with an out-of-range index
+        assert result == "First: value1 Second: value2 Third: value3"
+
+    def test_invalid_index(self, test_vars):
+        # Out-of-range indices are left unchanged
         result = substitute_prompt_vars("This should remain unchanged: __test:999__")
-        self.assertEqual(result, "This should remain unchanged: __test:999__")
-    
-    @patch('pyros_cli.services.prompt_substitution.load_prompt_vars')
-    @patch('pyros_cli.services.prompt_substitution.console')
-    def test_mixed_variables(self, mock_console, mock_load_vars):
-        # Mock the prompt_vars dictionary
-        test_vars = {
-            "__test__": PromptVars(
-                prompt_id="__test__",
-                file_path="test.txt",
-                description="Test variable",
-                values=["value1", "value2", "value3"]
-            )
-        }
-        mock_load_vars.return_value = test_vars
-        
-        # Test with a mix of indexed and random variables
-        with patch('random.choice', return_value="value1"):
+        assert result == "This should remain unchanged: __test:999__"
+
+    def test_repeated_invalid_index(self, test_vars):
+        # The memoized token is returned as-is, not expanded again
+        result = substitute_prompt_vars("__test:999__ and __test:999__")
+        assert result == "__test:999__ and __test:999__"
+
+    def test_mixed_variables(self, test_vars):
+        # A mix of indexed and random variables
+        with patch('pyros_cli.services.prompt_substitution._rng.randrange', return_value=0):
             result = substitute_prompt_vars("Random: __test__ Indexed: __test:2__")
-            self.assertEqual(result, "Random: value1 Indexed: value3")
+        assert result == "Random: value1 Indexed: value3"
+
+    def test_missing_variables_generated_in_one_batch(self, mock_load_vars, mock_generate):
+        # Both missing variables are requested together, each only once
+        prompt = "A __color__ __animal__ and a __color__ one"
+        assert substitute_prompt_vars(prompt) == prompt
+        mock_generate.assert_awaited_once_with(["color", "animal"], prompt)
+
+    def test_async_substitution(self, test_vars):
+        async def run():
+            # The sync wrapper refuses to run inside an event loop
+            with pytest.raises(RuntimeError):
+                substitute_prompt_vars("__test:1__")
+            return await substitute_prompt_vars_async("__test:1__")
+
+        assert asyncio.run(run()) == "value2"
+
+    def test_repeated_variable_sampled_once(self, test_vars):
+        # All occurrences are drawn in a single call, in order
+        with patch('pyros_cli.services.prompt_substitution._rng.choices', return_value=["value3", "value1", "value2"]) as mock_choices:
+            result = substitute_prompt_vars("__test__, __test__ and __test__")
+        assert result == "value3, value1 and value2"
+        mock_choices.assert_called_once_with(test_vars["__test__"].values, k=3)
+
+    def test_plain_prompt_skips_loading(self, mock_load_vars):
+        # Prompts without any variable marker are returned untouched
+        assert substitute_prompt_vars("A plain prompt with a_single underscore") == "A plain prompt with a_single underscore"
+        # So are prompts with "__" that isn't a valid variable token
+        assert substitute_prompt_vars("Dunder __ but no __!token!__ here") == "Dunder __ but no __!token!__ here"
+        mock_load_vars.assert_not_called()
+
+    def test_batch_substitution(self, test_vars, mock_load_vars, mock_generate):
+        prompts = ["A __test:0__ __color__", "no variables", "B __test:2__ __animal__ __color__"]
+        result = substitute_prompt_vars_batch(prompts)
+        assert result == ["A value1 __color__", "no variables", "B value3 __animal__ __color__"]
+
+        # Variables are loaded once and missing ones generated in one run
+        mock_load_vars.assert_called_once()
+        mock_generate.assert_awaited_once_with(
+            ["color", "animal"], "A __test:0__ __color__\nB __test:2__ __animal__ __color__"
+        )
+
+    def test_nested_variable_substitution(self, test_vars):
+        # Values may reference other variables, or even themselves
+        test_vars["__outer__"] = make_var("__outer__", ["a __test:1__ inside"], "Nested variable")
+        test_vars["__loop__"] = make_var("__loop__", ["x __loop:0__"], "Self-referencing variable")
+
+        assert substitute_prompt_vars("Nested: __outer:0__", auto_generate=False) == "Nested: a value2 inside"
+
+        # Self references stop expanding at the nesting limit
+        result = substitute_prompt_vars("__loop:0__", auto_generate=False)
+        assert result.startswith("x x x")
+        assert result.endswith("__loop:0__")
+
+    def test_subfolder_and_hyphenated_variables(self, mock_load_vars):
+        # Variables from subfolders and with hyphens in their names
+        mock_load_vars.return_value = {
+            "__style/colors__": make_var("__style/colors__", ["red", "green"], "Subfolder variable"),
+            "__art-style__": make_var("__art-style__", ["cubism", "baroque"], "Hyphenated variable"),
+        }
 
-if __name__ == "__main__":
-    unittest.main() 
\ No newline at end of file
+        result = substitute_prompt_vars("__style/colors:1__ in __art-style:0__", auto_generate=False)
+        assert result == "green in cubism"
@@ -0,0 +1,18 @@
+"""Prerendered ASCII art for the CLI banner.
+
+Generated once with the `art` package so it isn't needed at runtime:
+
+    text2art("Pyro's CLI", font="tarty4")
+    text2art("**Generating images with style**", font="handwriting1")
+"""
+
+TITLE_ART = (
+    " \n"
+    "▒█▀▀█ █░░█ █▀▀█ █▀▀█ █ █▀▀  ▒█▀▀█ ▒█░░░ ▀█▀ \n"
+    "▒█▄▄█ █▄▄█ █▄▄▀ █░░█ ░ ▀▀█  ▒█░░░ ▒█░░░ ▒█░ \n"
+    "▒█░░░ ▄▄▄█ ▀░▀▀ ▀▀▀▀ ░ ▀▀▀  ▒█▄▄█ ▒█▄▄█ ▄█▄ "
+)
+
+SUBTITLE_ART = (
+    "**𝒢𝑒𝓃𝑒𝓇𝒶𝓉𝒾𝓃𝑔 𝒾𝓂𝒶𝑔𝑒𝓈 𝓌𝒾𝓉𝒽 𝓈𝓉𝓎𝓁𝑒**"
+)
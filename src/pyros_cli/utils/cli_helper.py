@@ -1,45 +1,73 @@
 """CLI utility functions for rich console output."""
 
-from rich.console import Console
-from art import text2art
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-console = Console()
+from pyros_cli.utils._banner_data import TITLE_ART, SUBTITLE_ART
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+# Created on first use, so importing this module doesn't pull in rich
+_console = None
+
+# Decorative border for print_header
+_HDR_BAR = "═" * 50
+
+
+def get_console() -> "Console":
+    """Return the shared console, creating it on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def __getattr__(name: str):
+    """Resolve the module-level `console` lazily."""
+    if name == "console":
+        return get_console()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def banner_text():
     """Display the CLI banner."""
+    console = get_console()
     console.clear()
     
-    test = text2art("Pyro's CLI", font="tarty4")
-    console.print(test, style="green")
-    text = text2art("**Generating images with style**", font="handwriting1")
-    console.print(text, style="green")
+    console.print(TITLE_ART, style="green")
+    console.print(SUBTITLE_ART, style="green")
     console.line(1)
 
 
+@lru_cache(maxsize=128)
+def _dash(n: int) -> str:
+    """Return a subheader underline of length n."""
+    return "─" * n
+
+
 def print_header(text: str) -> None:
     """Print a header with decorative borders."""
-    console.print(f"\n[bold blue]{'═' * 50}[/bold blue]")
-    console.print(f"[bold blue]{text}[/bold blue]")
-    console.print(f"[bold blue]{'═' * 50}[/bold blue]\n")
+    # One print call, so the markup is parsed and written out once
+    get_console().print(f"\n[bold blue]{_HDR_BAR}\n{text}\n{_HDR_BAR}[/bold blue]\n")
 
 
 def print_subheader(text: str) -> None:
     """Print a subheader."""
-    console.print(f"\n[bold cyan]{text}[/bold cyan]")
-    console.print(f"[cyan]{'─' * len(text)}[/cyan]")
+    get_console().print(f"\n[bold cyan]{text}[/bold cyan]\n[cyan]{_dash(len(text))}[/cyan]")
 
 
 def print_success(text: str) -> None:
     """Print a success message."""
-    console.print(f"[bold green]✓[/bold green] {text}")
+    get_console().print(f"[bold green]✓[/bold green] {text}")
 
 
 def print_error(text: str) -> None:
     """Print an error message."""
-    console.print(f"[bold red]✗ Error:[/bold red] {text}")
+    get_console().print(f"[bold red]✗ Error:[/bold red] {text}")
 
 
 def print_warning(text: str) -> None:
     """Print a warning message."""
-    console.print(f"[bold yellow]⚠ Warning:[/bold yellow] {text}")
+    get_console().print(f"[bold yellow]⚠ Warning:[/bold yellow] {text}")
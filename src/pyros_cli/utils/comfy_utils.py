@@ -1,112 +1,132 @@
 # comfy_utils.py
+import asyncio
 import json
 import uuid
 import os
-from typing import Any, Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
 from pydantic import ValidationError
 import websockets
+from websockets.asyncio.client import ClientConnection
+from websockets.protocol import State
 import aiohttp
 from loguru import logger
 from pyros_cli.models.comfyui_workflow import ComfyUIWorkflow
 from pyros_cli.services.config import ComfyUISettings # Import settings model
 from pyros_cli.services.preview import get_preview_renderable # Import preview function
-from rich.console import Console, Group
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn, TimeRemainingColumn
+from rich.console import Group
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn, TimeRemainingColumn, Task, TaskID
 from rich.text import Text
 from rich.live import Live
+from rich.live_render import LiveRender
+from rich.segment import Segment
 from pyros_cli.models.user_messages import UserMessages
+from pyros_cli.utils.cli_helper import console
 
-console = Console() # Make console available for final print
+# Use orjson for decoding when available; it is several times faster than
+# the stdlib parser and takes bytes directly. Its JSONDecodeError subclasses
+# json.JSONDecodeError, so error handling is the same either way.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
-# --- Rich Live Patch for crop_above support ---
-# This patch allows Rich's Live widget to crop content from the TOP instead of the bottom,
-# keeping the progress bar and status visible while the preview image gets cropped if too tall.
-_live_patch_applied = False
+# --- Rich Live with crop_above support ---
+# Rich's Live widget can only crop content from the bottom. These subclasses add
+# a 'crop_above' overflow that crops from the TOP instead, keeping the progress
+# bar and status visible while the preview image gets cropped if too tall.
 
+class _CropAboveLiveRender(LiveRender):
+    """LiveRender that also accepts vertical_overflow="crop_above"."""
 
-def _ensure_live_crop_above() -> None:
-    """Monkeypatch rich.live_render to support 'crop_above' overflow.
-    
-    This keeps the bottom content (progress bar, status) visible while
-    cropping the top (preview image) when content exceeds terminal height.
-    """
-    global _live_patch_applied
-    if _live_patch_applied:
-        return
-    try:
-        from typing import Literal as _Literal
-        from rich import live_render as _lr
-    except Exception:
-        return
-
-    # Extend the accepted literal at runtime
-    current_args = getattr(_lr.VerticalOverflowMethod, "__args__", ())
-    if "crop_above" not in current_args:
-        _lr.VerticalOverflowMethod = _Literal[
-            "crop", "crop_above", "ellipsis", "visible"
-        ]  # type: ignore[assignment]
-
-    if getattr(_lr.LiveRender.__rich_console__, "_pyros_crop_above", False):
-        _live_patch_applied = True
-        return
-
-    Segment = _lr.Segment
-    Text = _lr.Text
-    loop_last = _lr.loop_last
+    def __rich_console__(self, console, options):
+        if self.vertical_overflow != "crop_above":
+            yield from super().__rich_console__(console, options)
+            return
 
-    def _patched_rich_console(self, console, options):
-        renderable = self.renderable
         style = console.get_style(self.style)
-        lines = console.render_lines(renderable, options, style=style, pad=False)
-        shape = Segment.get_shape(lines)
-
-        _, height = shape
+        lines = console.render_lines(self.renderable, options, style=style, pad=False)
         max_height = options.size.height
-        if height > max_height:
-            if self.vertical_overflow == "crop":
-                lines = lines[:max_height]
-                shape = Segment.get_shape(lines)
-            elif self.vertical_overflow == "crop_above":
-                lines = lines[-max_height:]
-                shape = Segment.get_shape(lines)
-            elif self.vertical_overflow == "ellipsis" and max_height > 0:
-                lines = lines[: (max_height - 1)]
-                overflow_text = Text(
-                    "...",
-                    overflow="crop",
-                    justify="center",
-                    end="",
-                    style="live.ellipsis",
-                )
-                lines.append(list(console.render(overflow_text)))
-                shape = Segment.get_shape(lines)
-        self._shape = shape
+        if len(lines) > max_height:
+            # Keep the bottom lines, drop the top ones
+            lines = lines[-max_height:]
+        self._shape = Segment.get_shape(lines)
 
         new_line = Segment.line()
-        for last, line in loop_last(lines):
-            yield from line
-            if not last:
+        for index, line in enumerate(lines):
+            if index:
                 yield new_line
+            yield from line
+
 
-    _patched_rich_console._pyros_crop_above = True  # type: ignore[attr-defined]
-    _lr.LiveRender.__rich_console__ = _patched_rich_console
-    _live_patch_applied = True
+class _CropAboveLive(Live):
+    """Live display that renders through _CropAboveLiveRender."""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._live_render = _CropAboveLiveRender(
+            self.get_renderable(), vertical_overflow=self.vertical_overflow
+        )
 
-# Apply the patch on module import
-_ensure_live_crop_above()
+
+# --- Output Directory ---
+
+# Final images are saved here, relative to the working directory
+OUTPUT_DIR_NAME = "images"
+
+
+def _get_output_dir() -> str:
+    """Return the images output directory, creating it if needed.
+
+    Called once per history entry (not per image), and always re-checked so
+    a directory deleted or moved mid-session is simply recreated.
+    """
+    os.makedirs(OUTPUT_DIR_NAME, exist_ok=True)
+    return OUTPUT_DIR_NAME
 
 
 # --- Workflow Handling ---
 
-def load_workflow(filepath: str) -> ComfyUIWorkflow:
-    """Loads workflow from a JSON file."""
+# Loaded workflows per (file path, trusted), with the (mtime_ns, size) they
+# were read at. Workflows are never mutated (update_workflow copies), so they
+# can be shared.
+_workflow_cache: Dict[Tuple[str, bool], Tuple[Tuple[int, int], ComfyUIWorkflow]] = {}
+
+
+def load_workflow(filepath: str, trusted: bool = False) -> ComfyUIWorkflow:
+    """Loads workflow from a JSON file.
+
+    The result is cached and only re-read when the file's modification time
+    or size changes.
+
+    Args:
+        filepath: Path to the workflow JSON file
+        trusted: Skip validation and build the workflow with model_construct.
+            Much faster for large graphs, but a malformed file is only noticed
+            by ComfyUI when the prompt is sent. Only use it for workflow files
+            you exported yourself. The nodes are then plain dicts, not Node
+            models.
+    """
     logger.info(f"Loading workflow from: {filepath}")
     try:
-        with open(filepath, 'r') as f:
-            raw_json = json.load(f)
-        workflow = ComfyUIWorkflow.model_validate(raw_json)
+        stat = os.stat(filepath)
+        file_version = (stat.st_mtime_ns, stat.st_size)
+        cache_key = (filepath, trusted)
+        cached = _workflow_cache.get(cache_key)
+        if cached is not None and cached[0] == file_version:
+            logger.debug("Workflow unchanged, using cached copy.")
+            return cached[1]
+
+        with open(filepath, 'rb') as f:
+            raw_json = _json_loads(f.read())
+        if trusted:
+            workflow = ComfyUIWorkflow.model_construct(raw_json)
+        else:
+            workflow = ComfyUIWorkflow.model_validate(raw_json)
+        workflow._raw = raw_json
+        _workflow_cache[cache_key] = (file_version, workflow)
         logger.success("Workflow loaded successfully.")
         return workflow
     except FileNotFoundError:
@@ -122,67 +142,239 @@ def load_workflow(filepath: str) -> ComfyUIWorkflow:
         logger.error(f"An unexpected error occurred loading workflow: {e}")
         raise
 
+load_workflow.cache_clear = _workflow_cache.clear
 
-def update_workflow(
+
+def make_updater(
     workflow: ComfyUIWorkflow,
-    prompt_text: str,
-    seed: int,
     settings: ComfyUISettings,
     user_messages: UserMessages
-) -> Dict[str, Any]:
-    """Updates the workflow dictionary with new prompt and seed."""
-    workflow_dict = workflow.model_dump(mode='python') # Get a mutable dict
-
-    # Update Prompt
+) -> Callable[[str, int], Dict[str, Any]]:
+    """Prepares a workflow dictionary for repeated prompt and seed updates.
+
+    The node inputs for the prompt, the seed and the user's workflow properties
+    are looked up once here. The returned function then only assigns the new
+    prompt and seed, which matters when generating many images in a row.
+
+    Args:
+        workflow: The loaded workflow (left untouched)
+        settings: ComfyUI settings naming the prompt and seed nodes
+        user_messages: Holds the workflow properties to apply
+
+    Returns:
+        A function taking (prompt_text, seed) that updates and returns the
+        workflow dictionary. The same dictionary is returned on every call,
+        so send it before calling the function again.
+    """
+    raw_workflow = workflow._raw
+    if raw_workflow is None:
+        raw_workflow = workflow.model_dump(mode='python')
+
+    # Copy only the nodes that get updated (and their inputs), so the
+    # loaded workflow stays untouched without copying the whole graph
+    touched_node_ids = {settings.prompt_node_id, settings.denoise_node_id}
+    touched_node_ids.update(property.node_id for property in user_messages.workflow_properties)
+    workflow_dict = {
+        node_id: {**node, 'inputs': dict(node['inputs'])} if node_id in touched_node_ids else node
+        for node_id, node in raw_workflow.items()
+    }
+
+    # Resolve the prompt inputs
+    prompt_inputs = None
     if settings.prompt_node_id and settings.prompt_node_id in workflow_dict:
         if settings.prompt_node_property in workflow_dict[settings.prompt_node_id]['inputs']:
-            workflow_dict[settings.prompt_node_id]['inputs'][settings.prompt_node_property] = prompt_text
-            logger.debug(f"Updated prompt in node '{settings.prompt_node_id}', property '{settings.prompt_node_property}'.")
+            prompt_inputs = workflow_dict[settings.prompt_node_id]['inputs']
         else:
             logger.warning(f"Property '{settings.prompt_node_property}' not found in inputs of node '{settings.prompt_node_id}'. Prompt not updated.")
     else:
         logger.warning(f"Prompt node ID '{settings.prompt_node_id}' not found in workflow. Prompt not updated.")
 
-    # Update Seed
+    # Resolve the seed inputs
+    seed_inputs = None
     if settings.denoise_node_id and settings.denoise_node_id in workflow_dict:
         if settings.denoise_node_property in workflow_dict[settings.denoise_node_id]['inputs']:
-            workflow_dict[settings.denoise_node_id]['inputs'][settings.denoise_node_property] = seed
-            logger.debug(f"Updated seed in node '{settings.denoise_node_id}', property '{settings.denoise_node_property}'.")
+            seed_inputs = workflow_dict[settings.denoise_node_id]['inputs']
         else:
             logger.warning(f"Property '{settings.denoise_node_property}' not found in inputs of node '{settings.denoise_node_id}'. Seed not updated.")
     else:
         logger.warning(f"Seed node ID '{settings.denoise_node_id}' not found in workflow. Seed not updated.")
 
-    # Update Workflow Properties
-    if user_messages.workflow_properties:
-        for property in user_messages.workflow_properties:
-            if property.node_id in workflow_dict:
-                workflow_dict[property.node_id]['inputs'][property.node_property] = property.value
-                logger.debug(f"Updated workflow property in node '{property.node_id}', property '{property.node_property}'.")
-            else:
-                logger.warning(f"Node ID '{property.node_id}' not found in workflow. Property not updated.")
+    # Update Workflow Properties (these don't change between calls)
+    for property in user_messages.workflow_properties:
+        if property.node_id in workflow_dict:
+            workflow_dict[property.node_id]['inputs'][property.node_property] = property.value
+            logger.debug(f"Updated workflow property in node '{property.node_id}', property '{property.node_property}'.")
+        else:
+            logger.warning(f"Node ID '{property.node_id}' not found in workflow. Property not updated.")
+
+    prompt_property = settings.prompt_node_property
+    seed_property = settings.denoise_node_property
+
+    # Workflow properties take precedence over the prompt and seed, so don't
+    # write those over an input a property has already set
+    property_inputs = {(property.node_id, property.node_property) for property in user_messages.workflow_properties}
+    if (settings.prompt_node_id, prompt_property) in property_inputs:
+        prompt_inputs = None
+    if (settings.denoise_node_id, seed_property) in property_inputs:
+        seed_inputs = None
+
+    def apply(prompt_text: str, seed: int) -> Dict[str, Any]:
+        if prompt_inputs is not None:
+            prompt_inputs[prompt_property] = prompt_text
+        if seed_inputs is not None:
+            seed_inputs[seed_property] = seed
+        return workflow_dict
+
+    return apply
+
+
+def update_workflow(
+    workflow: ComfyUIWorkflow,
+    prompt_text: str,
+    seed: int,
+    settings: ComfyUISettings,
+    user_messages: UserMessages
+) -> Dict[str, Any]:
+    """Updates the workflow dictionary with new prompt and seed.
+
+    Returns a new dictionary on every call. For repeated updates of the same
+    workflow, use make_updater instead.
+    """
+    return make_updater(workflow, settings, user_messages)(prompt_text, seed)
+
+# --- HTTP Session ---
+
+# One session for all requests to ComfyUI, so connections are kept alive
+# and reused instead of being set up again for every request
+_session: aiohttp.ClientSession | None = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session if one was opened."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+# --- WebSocket ---
+
+# One client ID for the whole process. ComfyUI tells prompts apart by their
+# prompt ID, and a stable client ID lets one WebSocket serve many prompts.
+_client_id = uuid.uuid4().hex
+
+# The WebSocket is kept open across prompts, so only the first prompt of a
+# session pays for the connection handshake
+_websocket: ClientConnection | None = None
+_websocket_url: str | None = None
+
+# prepare_websocket waits this long for another queued frame before it
+# considers the socket drained, and gives up draining after the max time
+WEBSOCKET_DRAIN_TIMEOUT = 0.05
+WEBSOCKET_DRAIN_MAX_TIME = 1.0
+
+
+async def get_websocket(settings: ComfyUISettings, client_id: str | None = None) -> ClientConnection:
+    """Return the shared WebSocket, (re)connecting if needed.
+
+    A new connection is made on first use, after the old one was closed,
+    or when the URL (host, port or client ID) changed.
+
+    Nothing reads the socket between prompts: frames sent meanwhile queue
+    up, and once the receive queue is full websockets stops reading, so
+    keepalive pongs go unanswered and the connection may be closed. Call
+    prepare_websocket before queueing a prompt to drop that backlog and
+    reconnect if needed.
+    """
+    global _websocket, _websocket_url
+    ws_url = f"{settings.ws_url}?clientId={client_id or _client_id}"
+    if _websocket is not None and (_websocket.state is not State.OPEN or _websocket_url != ws_url):
+        await close_websocket()
+    if _websocket is None:
+        logger.info(f"Connecting to WebSocket: {ws_url}")
+        _websocket = await websockets.connect(ws_url, ping_interval=10, ping_timeout=30)
+        _websocket_url = ws_url
+    return _websocket
+
+
+async def prepare_websocket(settings: ComfyUISettings, client_id: str | None = None) -> ClientConnection:
+    """Return the shared WebSocket with the frames queued while idle dropped.
+
+    Call this right before send_prompt, so listen_for_results starts at the
+    messages about the new prompt instead of a stale backlog. A connection
+    that died while idle is replaced.
+    """
+    ws = await get_websocket(settings, client_id)
+    dropped = 0
+    deadline = asyncio.get_running_loop().time() + WEBSOCKET_DRAIN_MAX_TIME
+    try:
+        while asyncio.get_running_loop().time() < deadline:
+            # Cancelling recv on timeout is safe; no frame is lost or split
+            await asyncio.wait_for(ws.recv(decode=False), WEBSOCKET_DRAIN_TIMEOUT)
+            dropped += 1
+    except asyncio.TimeoutError:
+        pass
+    except websockets.exceptions.ConnectionClosed:
+        logger.info("WebSocket closed while idle, reconnecting")
+        ws = await get_websocket(settings, client_id)
+    if dropped:
+        logger.debug(f"Dropped {dropped} WebSocket messages received while idle")
+    return ws
+
+
+async def close_websocket() -> None:
+    """Close the shared WebSocket if one is open."""
+    global _websocket, _websocket_url
+    if _websocket is not None:
+        await _websocket.close()
+    _websocket = None
+    _websocket_url = None
 
-    return workflow_dict
 
 # --- ComfyUI API Interaction ---
 
-async def send_prompt(settings: ComfyUISettings, workflow_dict: Dict[str, Any]) -> Tuple[str, str]:
-    """Sends the workflow prompt to ComfyUI."""
-    client_id = str(uuid.uuid4())
+
+async def send_prompt(
+    settings: ComfyUISettings,
+    workflow_dict: Dict[str, Any],
+    client_id: str | None = None
+) -> Tuple[str, str]:
+    """Sends the workflow prompt to ComfyUI.
+
+    Args:
+        settings: ComfyUI settings
+        workflow_dict: The updated workflow to queue
+        client_id: Client ID to send with the prompt; defaults to the
+            process-wide one (pass your own e.g. to isolate tests)
+
+    Returns:
+        Tuple of (prompt_id, client_id)
+    """
+    client_id = client_id or _client_id
     payload = {"prompt": workflow_dict, "client_id": client_id}
     url = f"{settings.http_url}/prompt"
 
     logger.info(f"Sending prompt to {url} (Client ID: {client_id})")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                response.raise_for_status() # Raise exception for bad status codes
-                response_data = await response.json()
-                prompt_id = response_data.get("prompt_id")
-                if not prompt_id:
-                     raise ValueError("Prompt ID not found in ComfyUI response")
-                logger.success(f"Prompt queued successfully. Prompt ID: {prompt_id}")
-                return prompt_id, client_id
+        session = await get_session()
+        async with session.post(url, json=payload) as response:
+            response.raise_for_status() # Raise exception for bad status codes
+            response_data = await response.json()
+            prompt_id = response_data.get("prompt_id")
+            if not prompt_id:
+                 raise ValueError("Prompt ID not found in ComfyUI response")
+            logger.success(f"Prompt queued successfully. Prompt ID: {prompt_id}")
+            return prompt_id, client_id
     except aiohttp.ClientResponseError as e:
         logger.error(f"HTTP Error sending prompt: {e.status} {e.message}")
         logger.error(f"Response: {await e.text()}") # Log response body for debugging
@@ -195,13 +387,97 @@ async def send_prompt(settings: ComfyUISettings, workflow_dict: Dict[str, Any])
         raise
 
 
+# --- WebSocket Message Handlers ---
+
+@dataclass
+class _ListenState:
+    """State shared by the message handlers while listening for one prompt."""
+    prompt_id: str
+    progress: Progress
+    status_text: Text
+    progress_task_id: TaskID | None = None # Set when the first progress message arrives
+    progress_task: Task | None = None # The Task itself; progress.tasks rebuilds a list on every access
+    refresh: bool = False # Redraw right away instead of on Live's next refresh
+    running: bool = False # Our prompt started executing; other prompts' previews are ignored until then
+    done: bool = False # Our prompt finished executing
+
+
+def _handle_status(payload: Dict[str, Any], state: _ListenState) -> None:
+    status = payload.get('status')
+    exec_info = status.get('exec_info') if status else None
+    queue_remaining = exec_info.get('queue_remaining', 0) if exec_info else 0
+    state.status_text.plain = f"Queue status: {queue_remaining} remaining"
+
+
+def _handle_progress(payload: Dict[str, Any], state: _ListenState) -> None:
+    progress_prompt_id = payload.get('prompt_id')
+    if progress_prompt_id is None:
+        # Older ComfyUI versions don't tag progress with a prompt ID; then
+        # it is ours only while our prompt is executing
+        if not state.running:
+            return
+    elif progress_prompt_id != state.prompt_id:
+        return
+    value = payload.get('value', 0)
+    max_val = payload.get('max', 0)
+    if max_val > 0:
+        if state.progress_task_id is None:
+            # Add task only once
+            state.progress_task_id = state.progress.add_task("", total=max_val, node="") # Add node field
+            state.progress_task = state.progress.tasks[0]
+        state.progress.update(state.progress_task_id, completed=value, description="") # Clear description for now
+
+
+def _handle_executing(payload: Dict[str, Any], state: _ListenState) -> None:
+    if payload.get('prompt_id') != state.prompt_id:
+        return
+    node_id = payload.get('node')
+    state.refresh = True
+    if node_id is None: # End of execution for this prompt
+        state.status_text.plain = f"Execution finished for prompt ID: {state.prompt_id}"
+        task = state.progress_task
+        if task is not None and not task.finished:
+            state.progress.update(state.progress_task_id, completed=task.total, description="Done")
+        state.done = True
+    else:
+        state.running = True
+        # Update status/progress description with current node
+        state.status_text.plain = f"Executing node: {node_id or '...'}"
+        if state.progress_task_id is not None:
+            state.progress.update(state.progress_task_id, description=f"Node {node_id}")
+
+
+def _handle_execution_error(payload: Dict[str, Any], state: _ListenState) -> None:
+    node_info = f"Node {payload.get('node_id')} ({payload.get('node_type')})"
+    error_msg = payload.get('exception_message', 'Unknown error')
+    state.status_text.plain = f"Error: {node_info} - {error_msg}"
+    logger.error(f"Execution Error: {payload}") # Log full error
+    if state.progress_task_id is not None:
+        state.progress.stop_task(state.progress_task_id)
+    # Consider breaking or allowing user action on error
+
+
+# Handlers per ComfyUI message type; add other message types here if needed
+_MESSAGE_HANDLERS: Dict[str, Callable[[Dict[str, Any], _ListenState], None]] = {
+    'status': _handle_status,
+    'progress': _handle_progress,
+    'executing': _handle_executing,
+    'execution_error': _handle_execution_error,
+}
+
+# Passed to handlers for messages without a 'data' object (never modified)
+_NO_DATA: Dict[str, Any] = {}
+
+
 async def listen_for_results(settings: ComfyUISettings, prompt_id: str, client_id: str):
-    """Listens to WebSocket using rich.Live for updating display."""
-    ws_url = f"{settings.ws_url}?clientId={client_id}"
-    logger.info(f"Connecting to WebSocket: {ws_url}")
+    """Listens to WebSocket using rich.Live for updating display.
 
+    Only messages about prompt_id are shown; call prepare_websocket before
+    queueing the prompt so messages from while the socket was idle are
+    skipped. The WebSocket stays open afterwards for the next prompt; call
+    close_websocket when done.
+    """
     # --- Rich Live Display Setup ---
-    latest_preview_renderable = None
     progress = Progress(
         SpinnerColumn(),
         TextColumn("[bold cyan]Generating: [/]{task.description}", justify="right"),
@@ -214,102 +490,72 @@ async def listen_for_results(settings: ComfyUISettings, prompt_id: str, client_i
         # TextColumn("[yellow]{task.fields[node]}"), # Example: add node field later
         transient=False, # Keep progress bar after completion for review
     )
-    progress_task_id = None # Will be set when first progress message arrives
 
     # Status text line
     status_text = Text("Connecting...", style="dim")
+    state = _ListenState(prompt_id=prompt_id, progress=progress, status_text=status_text)
 
-    def make_renderable() -> Group:
-        """Creates the renderable Group for the Live display."""
-        items = []
-        if latest_preview_renderable:
-            items.append(latest_preview_renderable)
-            items.append("") # Add a blank line for spacing
-        items.append(progress)
-        items.append(status_text)
-        return Group(*items)
+    # The display is built once and mutated in place: Live re-renders the same
+    # Group on every refresh, so progress and status changes show up on their
+    # own. Only the preview slot is swapped when a new preview arrives.
+    preview_slot = Group()
+    display = Group(preview_slot, progress, status_text)
 
     # The Live context manager - using crop_above to keep progress bar visible
     # while cropping preview image from top if it exceeds terminal height
-    with Live(make_renderable(), refresh_per_second=5, vertical_overflow="crop_above") as live:
+    with _CropAboveLive(display, refresh_per_second=5, vertical_overflow="crop_above") as live:  # type: ignore[arg-type]
         try:
-            async with websockets.connect(ws_url, ping_interval=10, ping_timeout=30) as ws:
-                status_text.plain = "WebSocket connected. Waiting for messages..."
-                live.update(make_renderable()) # Initial update
-
-                async for message in ws:
-                    if isinstance(message, str):
-                        try:
-                            data = json.loads(message)
-                            msg_type = data.get('type', 'unknown')
-
-                            if msg_type == 'status':
-                                status_data = data.get('data', {}).get('status', {})
-                                exec_info = status_data.get('exec_info', {})
-                                queue_remaining = exec_info.get('queue_remaining', 0)
-                                status_text.plain = f"Queue status: {queue_remaining} remaining"
-
-                            elif msg_type == 'progress':
-                                progress_data = data.get('data', {})
-                                value = progress_data.get('value', 0)
-                                max_val = progress_data.get('max', 0)
-                                if max_val > 0:
-                                    if progress_task_id is None:
-                                        # Add task only once
-                                        progress_task_id = progress.add_task("", total=max_val, node="") # Add node field
-                                    # Update progress (safe even if task_id is None initially)
-                                    progress.update(progress_task_id, completed=value, description="") # Clear description for now
-
-                            elif msg_type == 'executing':
-                                exec_data = data.get('data', {})
-                                node_id = exec_data.get('node')
-                                current_prompt_id = exec_data.get('prompt_id')
-
-                                if current_prompt_id == prompt_id:
-                                    if node_id is None: # End of execution for this prompt
-                                        status_text.plain = f"Execution finished for prompt ID: {prompt_id}"
-                                        if progress_task_id is not None and not progress.tasks[0].finished:
-                                             progress.update(progress_task_id, completed=progress.tasks[0].total, description="Done")
-                                        break # Exit the message loop
-                                    else:
-                                        # Update status/progress description with current node
-                                        status_text.plain = f"Executing node: {node_id or '...'}"
-                                        if progress_task_id is not None:
-                                            progress.update(progress_task_id, description=f"Node {node_id}")
-
-                            elif msg_type == 'execution_error':
-                                error_data = data.get('data', {})
-                                node_info = f"Node {error_data.get('node_id')} ({error_data.get('node_type')})"
-                                error_msg = error_data.get('exception_message', 'Unknown error')
-                                status_text.plain = f"Error: {node_info} - {error_msg}"
-                                logger.error(f"Execution Error: {error_data}") # Log full error
-                                if progress_task_id is not None:
-                                     progress.stop_task(progress_task_id)
-                                # Consider breaking or allowing user action on error
-
-                            # Add other message type handlers if needed...
-
-                        except json.JSONDecodeError:
-                            logger.warning(f"Received invalid JSON: {message[:100]}...")
-                        except Exception as e:
-                            logger.error(f"Error processing WebSocket message: {e}")
-                            status_text.plain = f"Error processing message: {e}"
-
-                    elif isinstance(message, bytes):
-                        # Handle preview image
-                        image_data = message[8:]
-                        if image_data:
-                            logger.debug(f"Received preview image ({len(image_data)} bytes)")
-                            # Get the renderable (term_image object or Text)
-                            preview = await get_preview_renderable(image_data)
-                            if preview:
-                                latest_preview_renderable = preview
-                                # Live display will update on next refresh cycle
-                        else:
-                            logger.debug("Received empty binary message.")
-
-                    # Update the live display explicitly after handling a message
-                    live.update(make_renderable())
+            # Reuses the open connection from earlier prompts, if any
+            ws = await get_websocket(settings, client_id)
+            status_text.plain = "WebSocket connected. Waiting for messages..."
+            live.refresh() # Initial update
+
+            while True:
+                # Receive text frames undecoded as well: JSON is parsed
+                # straight from the bytes, which skips the UTF-8 decoding
+                # websockets would otherwise do for every message.
+                # A normal close raises ConnectionClosedOK (handled below).
+                message = await ws.recv(decode=False)
+                state.refresh = False
+                if message[:1] == b"{":
+                    try:
+                        data = _json_loads(message)
+                        handler = _MESSAGE_HANDLERS.get(data.get('type'))
+                        if handler is not None:
+                            handler(data.get('data') or _NO_DATA, state)
+                            if state.done:
+                                break # Exit the message loop
+
+                    except json.JSONDecodeError:
+                        logger.warning(f"Received invalid JSON: {message[:100]}...")
+                    except Exception as e:
+                        logger.error(f"Error processing WebSocket message: {e}")
+                        status_text.plain = f"Error processing message: {e}"
+
+                else:
+                    # Handle preview image (binary frame with an 8-byte header)
+                    # Zero-copy view of the payload; the bytes are only copied
+                    # if the preview is actually decoded
+                    image_data = memoryview(message)[8:]
+                    if not state.running:
+                        # Previews carry no prompt ID; before our prompt
+                        # runs they belong to another one
+                        logger.debug("Ignoring preview for another prompt.")
+                    elif image_data:
+                        logger.debug(f"Received preview image ({len(image_data)} bytes)")
+                        # Get the renderable (term_image object or Text)
+                        preview = await get_preview_renderable(image_data)
+                        if preview:
+                            # Preview plus a blank line for spacing
+                            preview_slot.renderables[:] = [preview, ""]
+                            state.refresh = True
+                    else:
+                        logger.debug("Received empty binary message.")
+
+                # Everything else is drawn on Live's next refresh; show a
+                # new node or preview right away
+                if state.refresh:
+                    live.refresh()
 
         except websockets.exceptions.ConnectionClosedOK:
             status_text.plain = "WebSocket connection closed normally."
@@ -325,16 +571,99 @@ async def listen_for_results(settings: ComfyUISettings, prompt_id: str, client_i
             logger.error(f"WebSocket error: {e}", exc_info=True)
         finally:
             # Ensure progress stops cleanly if loop exits unexpectedly
-            if progress_task_id is not None and not progress.tasks[0].finished:
-                progress.stop_task(progress_task_id)
+            if state.progress_task is not None and not state.progress_task.finished:
+                progress.stop_task(state.progress_task_id)
             # Final update to show final status text
-            live.update(make_renderable())
+            live.refresh()
             logger.info("WebSocket listener finished.")
 
     # Live display stops automatically here
     console.print(f"Final status: {status_text.plain}", style="bold") # Print final status after Live exits
 
 
+# Final images are read from the response in chunks of this size...
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# ...and gathered into writes of at least this size, so a large image
+# takes a few worker-thread hops instead of one per chunk
+DOWNLOAD_WRITE_SIZE = 1024 * 1024
+
+
+def _write_text(filepath: str, text: str) -> None:
+    """Write text to filepath as UTF-8 (run in a worker thread)."""
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _finish_download(f, filepath: str, tail: bytes | bytearray | None) -> None:
+    """Write the last buffered bytes and close f (run in a worker thread).
+
+    With tail None the download failed, so the partial file is removed.
+    """
+    try:
+        if tail:
+            f.write(tail)
+    finally:
+        f.close()
+        if tail is None:
+            # Don't leave a partial image behind
+            os.remove(filepath)
+
+
+async def _download_image(
+    session: aiohttp.ClientSession,
+    view_url: str,
+    params: Dict[str, str],
+    output_dir: str,
+    evaluated_prompt: str = None
+) -> str | None:
+    """Downloads one final image (and saves its prompt next to it).
+
+    Returns:
+        The saved image path, or None if the download or save failed
+    """
+    filename = params["filename"]
+    try:
+        logger.debug(f"Downloading image: {filename}")
+        final_filepath = os.path.join(output_dir, filename)
+        async with session.get(view_url, params=params) as img_response:
+            img_response.raise_for_status()
+            # Stream the body to disk, so at most about one write's worth is
+            # held in memory. File I/O runs in a thread so other downloads
+            # keep going.
+            total_bytes = 0
+            buffer = bytearray()
+            tail = None
+            f = await asyncio.to_thread(open, final_filepath, "wb")
+            try:
+                async for chunk in img_response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    buffer += chunk
+                    total_bytes += len(chunk)
+                    if len(buffer) >= DOWNLOAD_WRITE_SIZE:
+                        await asyncio.to_thread(f.write, buffer)
+                        buffer.clear()
+                tail = buffer
+            finally:
+                await asyncio.to_thread(_finish_download, f, final_filepath, tail)
+        logger.success(f"Final image saved: {final_filepath} ({total_bytes} bytes)")
+
+        # Save the evaluated prompt to a text file with the same name
+        if evaluated_prompt:
+            # Get the filename without extension
+            file_base = os.path.splitext(filename)[0]
+            prompt_filepath = os.path.join(output_dir, f"{file_base}.txt")
+            await asyncio.to_thread(_write_text, prompt_filepath, evaluated_prompt)
+            logger.success(f"Prompt saved: {prompt_filepath}")
+            console.print(f"[green]Prompt saved:[/] {prompt_filepath}")
+
+        return final_filepath
+
+    except aiohttp.ClientResponseError as img_err:
+         logger.error(f"HTTP Error downloading image {filename}: {img_err.status} {img_err.message}")
+    except Exception as img_err:
+         logger.error(f"Failed to download or save image {filename}: {img_err}")
+    return None
+
+
 async def fetch_and_save_final_images(settings: ComfyUISettings, prompt_id: str, evaluated_prompt: str = None) -> List[str]:
     """Fetches history, finds final images, downloads, and saves them."""
     history_url = f"{settings.http_url}/history/{prompt_id}"
@@ -342,10 +671,10 @@ async def fetch_and_save_final_images(settings: ComfyUISettings, prompt_id: str,
     saved_image_paths = []
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(history_url) as response:
-                response.raise_for_status()
-                history_data = await response.json()
+        session = await get_session()
+        async with session.get(history_url) as response:
+            response.raise_for_status()
+            history_data = _json_loads(await response.read())
 
         if prompt_id not in history_data:
             logger.warning(f"Prompt ID {prompt_id} not found in history.")
@@ -360,9 +689,11 @@ async def fetch_and_save_final_images(settings: ComfyUISettings, prompt_id: str,
             return []
 
         logger.debug(f"Found {len(outputs)} output nodes in history.")
-        os.makedirs("images", exist_ok=True)
+        output_dir = _get_output_dir()
 
-        images_found = False
+        # Collect the downloads, then run them concurrently
+        view_url = f"{settings.http_url}/view"
+        downloads = []
         for node_id, node_output in outputs.items():
             if 'images' in node_output:
                 for i, image_info in enumerate(node_output['images']):
@@ -374,49 +705,23 @@ async def fetch_and_save_final_images(settings: ComfyUISettings, prompt_id: str,
                         logger.warning(f"Node {node_id} image {i+1} has missing filename. Skipping.")
                         continue
 
-                    images_found = True
                     logger.info(f"Found final image in node {node_id}: {filename} (Type: {img_type})")
-
-                    # Construct view URL
-                    view_url = f"{settings.http_url}/view"
                     params = {
                         "filename": filename,
                         "subfolder": subfolder,
                         "type": img_type
                     }
+                    downloads.append(
+                        _download_image(session, view_url, params, output_dir, evaluated_prompt)
+                    )
 
-                    try:
-                        logger.debug(f"Downloading image: {filename}")
-                        async with aiohttp.ClientSession() as img_session:
-                            async with img_session.get(view_url, params=params) as img_response:
-                                img_response.raise_for_status()
-                                image_content = await img_response.read()
-
-                        final_filepath = os.path.join("images", filename)
-                        with open(final_filepath, "wb") as f:
-                            f.write(image_content)
-                        logger.success(f"Final image saved: {final_filepath} ({len(image_content)} bytes)")
-                        saved_image_paths.append(final_filepath)
-                        
-                        # Save the evaluated prompt to a text file with the same name
-                        if evaluated_prompt:
-                            # Get the filename without extension
-                            file_base = os.path.splitext(filename)[0]
-                            prompt_filepath = os.path.join("images", f"{file_base}.txt")
-                            with open(prompt_filepath, "w", encoding="utf-8") as f:
-                                f.write(evaluated_prompt)
-                            logger.success(f"Prompt saved: {prompt_filepath}")
-                            console.print(f"[green]Prompt saved:[/] {prompt_filepath}")
-
-                    except aiohttp.ClientResponseError as img_err:
-                         logger.error(f"HTTP Error downloading image {filename}: {img_err.status} {img_err.message}")
-                    except Exception as img_err:
-                         logger.error(f"Failed to download or save image {filename}: {img_err}")
-
-
-        if not images_found:
+        if not downloads:
             logger.warning(f"No images found in any output nodes for prompt ID: {prompt_id}")
 
+        # Keep the order of the history; failed downloads return None
+        results = await asyncio.gather(*downloads)
+        saved_image_paths.extend(path for path in results if path)
+
     except aiohttp.ClientResponseError as e:
         logger.error(f"HTTP Error fetching history: {e.status} {e.message}")
         logger.error(f"Response: {await e.text()}")
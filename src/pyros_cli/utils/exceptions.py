@@ -3,16 +3,27 @@ Custom exceptions for the Pyros CLI application.
 
 This module contains a hierarchy of custom exceptions that allow for more granular
 error handling and more helpful error messages for users.
+
+The detailed message (e.g. naming the service or path) is only formatted when
+the exception is rendered, so creating and catching one stays cheap.
 """
 
 class PyrosError(Exception):
     """Base exception class for all Pyros CLI errors."""
     def __init__(self, message="An error occurred in Pyros CLI", *args, **kwargs):
-        self.message = message
+        self._message = message
         super().__init__(message, *args, **kwargs)
-        
+
+    def _format(self):
+        """Build the full message; subclasses add their context here."""
+        return self._message
+
+    @property
+    def message(self):
+        return self._format()
+
     def __str__(self):
-        return self.message
+        return self._format()
 
 
 class ConfigurationError(PyrosError):
@@ -25,19 +36,25 @@ class ConnectionError(PyrosError):
     """Exception raised for errors in connecting to external services."""
     def __init__(self, message="Connection error", service=None, *args, **kwargs):
         self.service = service
-        if service:
-            message = f"Connection error with {service}: {message}"
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.service:
+            return f"Connection error with {self.service}: {self._message}"
+        return self._message
+
 
 class WorkflowError(PyrosError):
     """Exception raised for errors in workflow files or processing."""
     def __init__(self, message="Workflow error", workflow=None, *args, **kwargs):
         self.workflow = workflow
-        if workflow:
-            message = f"Workflow error in '{workflow}': {message}"
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.workflow:
+            return f"Workflow error in '{self.workflow}': {self._message}"
+        return self._message
+
 
 class PromptError(PyrosError):
     """Exception raised for errors in prompt generation or processing."""
@@ -50,46 +67,59 @@ class APIError(PyrosError):
     def __init__(self, message="API error", api_name=None, status_code=None, *args, **kwargs):
         self.api_name = api_name
         self.status_code = status_code
-        
-        if api_name and status_code:
-            message = f"{api_name} API error (status {status_code}): {message}"
-        elif api_name:
-            message = f"{api_name} API error: {message}"
-        
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.api_name and self.status_code:
+            return f"{self.api_name} API error (status {self.status_code}): {self._message}"
+        elif self.api_name:
+            return f"{self.api_name} API error: {self._message}"
+        return self._message
+
 
 class ImageError(PyrosError):
     """Exception raised for errors in image processing or management."""
     def __init__(self, message="Image processing error", image_path=None, *args, **kwargs):
         self.image_path = image_path
-        if image_path:
-            message = f"Image error with '{image_path}': {message}"
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.image_path:
+            return f"Image error with '{self.image_path}': {self._message}"
+        return self._message
+
 
 class AuthenticationError(PyrosError):
     """Exception raised for errors in authentication."""
     def __init__(self, message="Authentication error", service=None, *args, **kwargs):
         self.service = service
-        if service:
-            message = f"Authentication error with {service}: {message}"
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.service:
+            return f"Authentication error with {self.service}: {self._message}"
+        return self._message
+
 
 class ValidationError(PyrosError):
     """Exception raised for errors in data validation."""
     def __init__(self, message="Validation error", field=None, *args, **kwargs):
         self.field = field
-        if field:
-            message = f"Validation error in '{field}': {message}"
         super().__init__(message, *args, **kwargs)
 
+    def _format(self):
+        if self.field:
+            return f"Validation error in '{self.field}': {self._message}"
+        return self._message
+
 
 class FileSystemError(PyrosError):
     """Exception raised for errors in file system operations."""
     def __init__(self, message="File system error", path=None, *args, **kwargs):
         self.path = path
-        if path:
-            message = f"File system error with path '{path}': {message}"
-        super().__init__(message, *args, **kwargs) 
\ No newline at end of file
+        super().__init__(message, *args, **kwargs)
+
+    def _format(self):
+        if self.path:
+            return f"File system error with path '{self.path}': {self._message}"
+        return self._message